@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import List, Optional, Tuple
+
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QStyleOptionViewItem, QApplication
+from PyQt5.QtCore import Qt, QEvent, QRect, QSize, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter
+
+from medication_model import MEDICATION_ID_ROLE
+from styles import StyleSheet
+
+class ActionButtonsDelegate(QStyledItemDelegate):
+    """
+    Item delegate that paints a row's action buttons and handles their clicks.
+    
+    Nothing is created per row: the buttons are drawn straight onto the
+    view, and a click emits clicked(action, medication_id) for the row under
+    the mouse. This replaces a QWidget, a layout and buttons per row.
+    """
+    clicked = pyqtSignal(str, int)
+    
+    SPACING = 5
+    PADDING = 8
+    HEIGHT = 26
+    
+    def __init__(self, actions: List[Tuple[str, str, str]], view):
+        """
+        Args:
+            actions (List[Tuple]): (action key, button label, style name) per
+                button, where style name is a key of StyleSheet.ACTION_BUTTON_COLORS
+            view (QAbstractItemView): View the delegate paints for
+        """
+        super().__init__(view)
+        self.view = view
+        # Hover needs mouse moves even with no button pressed, and the filter
+        # clears it when the mouse leaves the buttons' column
+        view.setMouseTracking(True)
+        view.viewport().installEventFilter(self)
+        self.actions = actions
+        self.font = QFont("Arial", 9)
+        metrics = QFontMetrics(self.font)
+        self._widths = [metrics.horizontalAdvance(label) + 2 * self.PADDING for _, label, _ in actions]
+        self._hover: Optional[Tuple[int, str]] = None  # (row, action) under the mouse
+    
+    def _button_rects(self, rect: QRect) -> List[QRect]:
+        """
+        Lay the buttons out centred vertically in a cell
+        """
+        height = min(self.HEIGHT, rect.height() - 4)
+        top = rect.top() + (rect.height() - height) // 2
+        left = rect.left() + self.SPACING
+        rects = []
+        for width in self._widths:
+            rects.append(QRect(left, top, width, height))
+            left += width + self.SPACING
+        return rects
+    
+    def _action_at(self, rect: QRect, pos) -> Optional[str]:
+        for (action, _, _), button in zip(self.actions, self._button_rects(rect)):
+            if button.contains(pos):
+                return action
+        return None
+    
+    def _set_hover(self, hover: Optional[Tuple[int, str]]):
+        if hover != self._hover:
+            self._hover = hover
+            self.view.viewport().update()
+    
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Leave:
+            self._set_hover(None)
+        elif event.type() == QEvent.MouseMove:
+            index = self.view.indexAt(event.pos())
+            if not index.isValid() or self.view.itemDelegateForColumn(index.column()) is not self:
+                self._set_hover(None)
+        return False
+    
+    def paint(self, painter, option, index):
+        # Cell background and selection, without any text
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        style = opt.widget.style() if opt.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+        
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(self.font)
+        for (action, label, style_name), button in zip(self.actions, self._button_rects(option.rect)):
+            normal, hover = StyleSheet.ACTION_BUTTON_COLORS[style_name]
+            hovered = self._hover == (index.row(), action)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(hover if hovered else normal))
+            painter.drawRoundedRect(button, 4, 4)
+            painter.setPen(QColor("white"))
+            painter.drawText(button, Qt.AlignCenter, label)
+        painter.restore()
+    
+    def sizeHint(self, option, index):
+        width = sum(self._widths) + self.SPACING * (len(self._widths) + 1)
+        return QSize(width, self.HEIGHT + 8)
+    
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseMove:
+            action = self._action_at(option.rect, event.pos())
+            hover = (index.row(), action) if action else None
+            self._set_hover(hover)
+            return False
+        
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            action = self._action_at(option.rect, event.pos())
+            if action:
+                self.clicked.emit(action, index.data(MEDICATION_ID_ROLE))
+                return True
+        
+        return super().editorEvent(event, model, option, index)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+from typing import Dict, List, Optional
+
+from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+from PyQt5.QtGui import QFont
+
+from database import get_recent_activity
+from db_tasks import TaskRunner
+
+def format_activity_time(timestamp: str) -> str:
+    """
+    Format a stock_history timestamp (UTC) as a short local time
+    """
+    try:
+        moment = datetime.datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return timestamp or ""
+    moment = moment.replace(tzinfo=datetime.timezone.utc).astimezone()
+    
+    days_ago = (datetime.datetime.now().astimezone().date() - moment.date()).days
+    if days_ago == 0:
+        return moment.strftime('%I:%M %p')
+    if days_ago == 1:
+        return "Yesterday"
+    return moment.strftime('%Y-%m-%d')
+
+def _activity_user(event: Dict) -> str:
+    if event['user_fullname'] is None:
+        return "-"
+    if event['user_role'] == 'admin':
+        return event['user_fullname']
+    return f"{event['user_fullname']} ({(event['user_role'] or '').capitalize()})"
+
+def _activity_text(event: Dict) -> str:
+    change = (event['new_stock'] or 0) - (event['previous_stock'] or 0)
+    return f"Stock {change:+d}: {event['reason']}" if event['reason'] else f"Stock {change:+d}"
+
+# Columns an ActivityFeed can show: key -> (header, display function)
+ACTIVITY_COLUMNS = {
+    'time': ("Time", lambda event: format_activity_time(event['timestamp'])),
+    'user': ("User", _activity_user),
+    'medication': ("Medication", lambda event: event['medication_name'] or f"#{event['medication_id']}"),
+    'activity': ("Activity", _activity_text),
+}
+
+class ActivityFeed(QTableWidget):
+    """
+    Recent Activity table fed from stock_history.
+    
+    reload() loads the newest events; after that, refresh() only asks for
+    events newer than the newest one shown and pushes them in at the top,
+    dropping the oldest rows so at most limit are kept.
+    """
+    def __init__(self, runner: TaskRunner, columns: List[str], limit: int = 20,
+                 task_key: str = 'activity', parent=None):
+        """
+        Args:
+            runner (TaskRunner): Runner the queries are submitted to
+            columns (List[str]): Keys of ACTIVITY_COLUMNS to show
+            limit (int): Number of events kept in the table
+            task_key (str): Task key of the feed's queries
+        """
+        super().__init__(0, len(columns), parent)
+        self.runner = runner
+        self.columns = columns
+        self.limit = limit
+        self.task_key = task_key
+        self._last_id: Optional[int] = None  # newest event shown
+        
+        self.setHorizontalHeaderLabels([ACTIVITY_COLUMNS[column][0] for column in columns])
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    
+    def reload(self):
+        """
+        Load the newest events, replacing every row
+        """
+        self.runner.submit(self.task_key, get_recent_activity, limit=self.limit,
+                           on_result=self._reloaded)
+    
+    def refresh(self):
+        """
+        Add the events recorded since the newest one shown
+        """
+        if self._last_id is None:
+            self.reload()
+            return
+        self.runner.submit(self.task_key, get_recent_activity, after_id=self._last_id, limit=self.limit,
+                           on_result=self._add_events)
+    
+    def _reloaded(self, events: List[Dict]):
+        self.setRowCount(0)
+        self._last_id = None
+        self._add_events(events)
+        if self._last_id is None:
+            # An empty history still counts as loaded
+            self._last_id = 0
+    
+    def _add_events(self, events: List[Dict]):
+        # Events come newest first; insert the oldest first so the newest ends on top
+        for event in reversed(events):
+            self.insertRow(0)
+            for col, column in enumerate(self.columns):
+                item = QTableWidgetItem(ACTIVITY_COLUMNS[column][1](event))
+                if column == 'time':
+                    item.setFont(QFont("Arial", 10, QFont.Bold))
+                self.setItem(0, col, item)
+        
+        if events:
+            self._last_id = max(events[0]['id'], self._last_id or 0)
+        while self.rowCount() > self.limit:
+            self.removeRow(self.rowCount() - 1)
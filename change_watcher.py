@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sqlite3
+from typing import Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from database import get_data_version, get_change_sequence, get_changes_since
+from db_tasks import TaskRunner
+
+class ChangeWatcher(QObject):
+    """
+    Polls the database for writes and reports which medications and users changed.
+    
+    Each tick only reads PRAGMA data_version on the GUI thread's connection,
+    which costs no table access, so an idle dashboard does almost no work.
+    When it moves, the change_log entries since the last poll are read on the
+    task runner and the ids they name are emitted. A None payload means the
+    log could not say exactly what changed and everything should be reloaded.
+    
+    data_version only moves for commits made by other connections, which
+    includes other terminals and the task runner's worker threads. Windows
+    call poll() right after their own writes, so those show through the same
+    targeted refresh without waiting for the next tick.
+    """
+    medications_changed = pyqtSignal(object)  # medication ids, or None
+    users_changed = pyqtSignal(object)  # user ids, or None
+    
+    POLL_INTERVAL_MS = 1000
+    
+    def __init__(self, runner: TaskRunner, interval_ms: int = POLL_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.poll)
+        self._version: Optional[int] = None  # data_version the reported changes cover
+        self._seq = 0
+        self._poll_again = False
+    
+    def start(self):
+        """
+        Start polling; only changes made from now on are reported
+        """
+        try:
+            self._version = get_data_version()
+            self._seq = get_change_sequence()
+        except sqlite3.Error:
+            self._version = None
+        self.timer.start()
+    
+    def stop(self):
+        """
+        Stop polling
+        """
+        self.timer.stop()
+        self.runner.cancel('changes')
+    
+    def poll(self):
+        """
+        Check data_version and read the change log if it moved
+        """
+        # One read at a time; check again as soon as the one in flight is done
+        if self.runner.is_busy('changes'):
+            self._poll_again = True
+            return
+        try:
+            version = get_data_version()
+        except sqlite3.Error:
+            return
+        if version == self._version:
+            return
+        
+        # Errors of this background read are retried, not shown to the user
+        self.runner.submit('changes', get_changes_since, self._seq, report_errors=False,
+                           on_result=lambda changes: self._changed(version, changes),
+                           on_error=self._read_failed)
+    
+    def _changed(self, version, changes):
+        # Only once the log has been read are the changes up to version handled
+        self._version = version
+        self._seq = changes['seq']
+        if not changes['complete']:
+            self.medications_changed.emit(None)
+            self.users_changed.emit(None)
+        else:
+            if changes['medication_ids']:
+                self.medications_changed.emit(changes['medication_ids'])
+            if changes['user_ids']:
+                self.users_changed.emit(changes['user_ids'])
+        self._poll_pending()
+    
+    def _read_failed(self, message):
+        # _version still differs from data_version, so the next poll reads the log again
+        self._poll_pending()
+    
+    def _poll_pending(self):
+        if self._poll_again:
+            self._poll_again = False
+            self.poll()
@@ -1,16 +1,25 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import datetime
+
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QLabel, QPushButton, QFrame, QTabWidget, 
                            QTableWidget, QTableWidgetItem, QHeaderView,
                            QMessageBox, QDialog, QFormLayout, QLineEdit,
                            QComboBox, QApplication, QStackedWidget, QSplitter,
-                           QTreeWidget, QTreeWidgetItem)
+                           QTreeWidget, QTreeWidgetItem, QTableView)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QFont, QIcon, QColor
 
-from database import get_all_users, add_medication, get_all_medications, delete_medication
+from database import (get_all_users, get_users_by_ids, add_medication, delete_medication,
+                      get_inventory_counters, get_user_counts, rollup_stock_history,
+                      get_stock_movement_report)
+from medication_model import PagedMedicationModel, attach_window_scrolling
+from db_tasks import TaskRunner, loading_label
+from change_watcher import ChangeWatcher
+from activity_feed import ActivityFeed
+from action_delegate import ActionButtonsDelegate
 from styles import StyleSheet
 
 
@@ -27,6 +36,12 @@ class AdminDashboard(QMainWindow):
         self.setMinimumSize(1200, 800)
         self.setStyleSheet(StyleSheet.MAIN_STYLE + StyleSheet.DASHBOARD_STYLE)
         
+        # Database calls run on a thread pool so a slow or locked database
+        # never freezes the window
+        self.tasks = TaskRunner(self)
+        self.tasks.failed.connect(self.on_task_failed)
+        self.stale_user_ids = set()  # users waiting to be re-read by refresh_users
+        
         # Create main widget and layout
         main_widget = QWidget()
         main_layout = QVBoxLayout(main_widget)
@@ -140,7 +155,7 @@ class AdminDashboard(QMainWindow):
         
         card1_title = QLabel("Total Users")
         card1_title.setFont(QFont("Arial", 14))
-        self.card1_value = QLabel("12")
+        self.card1_value = QLabel("…")
         self.card1_value.setFont(QFont("Arial", 24, QFont.Bold))
         self.card1_value.setAlignment(Qt.AlignCenter)
         
@@ -155,7 +170,7 @@ class AdminDashboard(QMainWindow):
         
         card2_title = QLabel("Total Medications")
         card2_title.setFont(QFont("Arial", 14))
-        self.card2_value = QLabel("342")
+        self.card2_value = QLabel("…")
         self.card2_value.setFont(QFont("Arial", 24, QFont.Bold))
         self.card2_value.setAlignment(Qt.AlignCenter)
         
@@ -170,7 +185,7 @@ class AdminDashboard(QMainWindow):
         
         card3_title = QLabel("Pharmacists")
         card3_title.setFont(QFont("Arial", 14))
-        self.card3_value = QLabel("7")
+        self.card3_value = QLabel("…")
         self.card3_value.setFont(QFont("Arial", 24, QFont.Bold))
         self.card3_value.setAlignment(Qt.AlignCenter)
         
@@ -185,14 +200,17 @@ class AdminDashboard(QMainWindow):
         
         card4_title = QLabel("Out of Stock")
         card4_title.setFont(QFont("Arial", 14))
-        card4_value = QLabel("15")
-        card4_value.setFont(QFont("Arial", 24, QFont.Bold))
-        card4_value.setAlignment(Qt.AlignCenter)
+        self.card4_value = QLabel("…")
+        self.card4_value.setFont(QFont("Arial", 24, QFont.Bold))
+        self.card4_value.setAlignment(Qt.AlignCenter)
         
         card4_layout.addWidget(card4_title)
-        card4_layout.addWidget(card4_value)
+        card4_layout.addWidget(self.card4_value)
         cards_layout.addWidget(card4)
         
+        # Fill the cards with live counts
+        self.update_dashboard_cards()
+        
         # Recent Activity
         activity_frame = QFrame()
         activity_frame.setObjectName("activityFrame")
@@ -201,28 +219,12 @@ class AdminDashboard(QMainWindow):
         activity_title = QLabel("Recent Activity")
         activity_title.setFont(QFont("Arial", 16, QFont.Bold))
         
-        activity_table = QTableWidget(5, 3)
-        activity_table.setHorizontalHeaderLabels(["Time", "User", "Activity"])
-        activity_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        
-        # Sample data
-        activities = [
-            ["10:30 AM", "John (Pharmacist)", "Added medication: Amoxicillin 500mg"],
-            ["09:45 AM", "Admin", "Created new user account: Sarah"],
-            ["09:30 AM", "Lisa (Pharmacist)", "Updated inventory for Paracetamol"],
-            ["Yesterday", "Admin", "Generated monthly sales report"],
-            ["Yesterday", "Mike (Pharmacist)", "Completed stock verification"]
-        ]
-        
-        for row, activity in enumerate(activities):
-            for col, data in enumerate(activity):
-                item = QTableWidgetItem(data)
-                if col == 0:
-                    item.setFont(QFont("Arial", 10, QFont.Bold))
-                activity_table.setItem(row, col, item)
+        # Newest stock changes, topped up as the change watcher reports writes
+        self.activity_feed = ActivityFeed(self.tasks, ['time', 'user', 'medication', 'activity'])
+        self.activity_feed.reload()
         
         activity_layout.addWidget(activity_title)
-        activity_layout.addWidget(activity_table)
+        activity_layout.addWidget(self.activity_feed)
         
         # Add widgets to dashboard layout
         dashboard_layout.addWidget(dashboard_title)
@@ -244,14 +246,24 @@ class AdminDashboard(QMainWindow):
         add_med_button.clicked.connect(self.add_new_medication)
         
         medications_header.addWidget(medications_title)
+        medications_header.addWidget(loading_label(self.tasks, 'medications', 'save_medication', 'delete_medication'))
         medications_header.addStretch()
         medications_header.addWidget(add_med_button)
         
         # Medications table
-        self.medications_table = QTableWidget()
+        self.medications_model = PagedMedicationModel(['id', 'name', 'category', 'stock', 'price', 'actions'],
+                                                       runner=self.tasks, task_key='medications', parent=self)
+        self.medications_table = QTableView()
         self.medications_table.setObjectName("dataTable")
-        self.medications_table.setColumnCount(6)
-        self.medications_table.setHorizontalHeaderLabels(["ID", "Name", "Category", "Stock", "Price", "Actions"])
+        self.medications_table.setModel(self.medications_model)
+        attach_window_scrolling(self.medications_table, self.medications_model)
+        
+        # Edit/Delete buttons are painted by a delegate, not created per row
+        medication_actions = ActionButtonsDelegate(
+            [('edit', "Edit", "editButton"), ('delete', "Delete", "deleteButton")], self.medications_table)
+        medication_actions.clicked.connect(self.on_medication_action)
+        self.medications_table.setItemDelegateForColumn(
+            self.medications_model.column_of('actions'), medication_actions)
         self.medications_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.medications_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
         self.medications_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
@@ -273,6 +285,7 @@ class AdminDashboard(QMainWindow):
         users_title.setFont(QFont("Arial", 20, QFont.Bold))
         
         users_header.addWidget(users_title)
+        users_header.addWidget(loading_label(self.tasks, 'users'))
         users_header.addStretch()
         
         # Users table
@@ -315,9 +328,29 @@ class AdminDashboard(QMainWindow):
         inventory_tab = QWidget()
         inventory_layout = QVBoxLayout(inventory_tab)
         
-        inventory_info = QLabel("Inventory status and details will be displayed here.")
-        inventory_info.setAlignment(Qt.AlignCenter)
-        inventory_layout.addWidget(inventory_info)
+        inventory_header = QHBoxLayout()
+        inventory_info = QLabel("Daily stock movement over the last 30 days")
+        
+        refresh_report_button = QPushButton("Refresh")
+        refresh_report_button.setObjectName("primaryButton")
+        refresh_report_button.clicked.connect(self.load_inventory_report)
+        
+        inventory_header.addWidget(inventory_info)
+        inventory_header.addWidget(loading_label(self.tasks, 'inventory_report'))
+        inventory_header.addStretch()
+        inventory_header.addWidget(refresh_report_button)
+        
+        self.inventory_report_table = QTableWidget()
+        self.inventory_report_table.setObjectName("dataTable")
+        self.inventory_report_table.setColumnCount(6)
+        self.inventory_report_table.setHorizontalHeaderLabels(["Date", "Medication", "In", "Out", "Net", "Movements"])
+        self.inventory_report_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        
+        # Load inventory report
+        self.load_inventory_report()
+        
+        inventory_layout.addLayout(inventory_header)
+        inventory_layout.addWidget(self.inventory_report_table)
         
         reports_tabs.addTab(inventory_tab, "Inventory Reports")
         
@@ -409,6 +442,12 @@ class AdminDashboard(QMainWindow):
         
         # Set central widget
         self.setCentralWidget(main_widget)
+        
+        # Follow changes made from other terminals as well as this one
+        self.watcher = ChangeWatcher(self.tasks, parent=self)
+        self.watcher.medications_changed.connect(self.on_medications_changed)
+        self.watcher.users_changed.connect(self.on_users_changed)
+        self.watcher.start()
     
     def change_page(self, index):
         """
@@ -424,54 +463,87 @@ class AdminDashboard(QMainWindow):
         # Switch to the selected page
         self.main_content.setCurrentIndex(index)
     
+    def on_task_failed(self, key, message):
+        """
+        Report a background database call that raised
+        """
+        QMessageBox.warning(self, "Database Error", message)
+    
+    def closeEvent(self, event):
+        # Results arriving after the window closed would touch deleted widgets
+        self.watcher.stop()
+        self.tasks.cancel_all()
+        super().closeEvent(event)
+    
+    def update_dashboard_cards(self):
+        """
+        Refresh the dashboard cards from the inventory counters and user counts
+        """
+        self.update_inventory_cards()
+        self.update_user_cards()
+    
+    def update_inventory_cards(self):
+        """
+        Refresh the medication cards from the inventory counters
+        """
+        self.tasks.submit('inventory_cards', get_inventory_counters, on_result=self.show_inventory_cards)
+    
+    def show_inventory_cards(self, counters):
+        self.card2_value.setText(str(counters['total_medications']))
+        self.card4_value.setText(str(counters['out_of_stock']))
+    
+    def update_user_cards(self):
+        """
+        Refresh the user cards from the user counts
+        """
+        self.tasks.submit('user_cards', get_user_counts, on_result=self.show_user_cards)
+    
+    def show_user_cards(self, user_counts):
+        self.card1_value.setText(str(user_counts['total_users']))
+        self.card3_value.setText(str(user_counts['active_pharmacists']))
+    
+    def on_medications_changed(self, medication_ids):
+        """
+        Show medication changes reported by the change watcher
+        
+        Args:
+            medication_ids (List[int]): Changed medications, or None if
+                everything has to be reloaded
+        """
+        if medication_ids is None:
+            self.load_medications_data()
+            self.activity_feed.reload()
+        else:
+            self.medications_model.refresh_medications(medication_ids)
+            self.activity_feed.refresh()
+        self.update_inventory_cards()
+    
+    def on_users_changed(self, user_ids):
+        """
+        Show user changes reported by the change watcher
+        
+        Args:
+            user_ids (List[int]): Changed users, or None if everything has to
+                be reloaded
+        """
+        if user_ids is None:
+            self.load_users_data()
+        else:
+            self.refresh_users(user_ids)
+        self.update_user_cards()
+    
     def load_medications_data(self):
         """
-        Load medications data from the database
-        """
-        medications = get_all_medications()
-        
-        self.medications_table.setRowCount(len(medications))
-        
-        for row, med in enumerate(medications):
-            # ID
-            id_item = QTableWidgetItem(str(med['id']))
-            self.medications_table.setItem(row, 0, id_item)
-            
-            # Name
-            name_item = QTableWidgetItem(med['name'])
-            self.medications_table.setItem(row, 1, name_item)
-            
-            # Category
-            category_item = QTableWidgetItem(med['category'])
-            self.medications_table.setItem(row, 2, category_item)
-            
-            # Stock
-            stock_item = QTableWidgetItem(str(med['stock']))
-            self.medications_table.setItem(row, 3, stock_item)
-            
-            # Price
-            price_item = QTableWidgetItem(f"${med['price']:.2f}")
-            self.medications_table.setItem(row, 4, price_item)
-            
-            # Actions
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout(actions_widget)
-            actions_layout.setContentsMargins(0, 0, 0, 0)
-            actions_layout.setSpacing(5)
-            
-            edit_btn = QPushButton("Edit")
-            edit_btn.setObjectName("editButton")
-            edit_btn.setMaximumWidth(60)
-            
-            delete_btn = QPushButton("Delete")
-            delete_btn.setObjectName("deleteButton")
-            delete_btn.setMaximumWidth(60)
-            delete_btn.clicked.connect(lambda _, med_id=med['id']: self.delete_medication(med_id))
-            
-            actions_layout.addWidget(edit_btn)
-            actions_layout.addWidget(delete_btn)
-            
-            self.medications_table.setCellWidget(row, 5, actions_widget)
+        Load the first page of medications; later pages load as the table scrolls
+        """
+        self.medications_model.reload()
+    
+    def on_medication_action(self, action, med_id):
+        """
+        Handle a click on one of the action buttons of the medications table
+        """
+        if action == 'delete':
+            self.delete_medication(med_id)
     
     def add_new_medication(self):
         """
@@ -557,11 +629,24 @@ class AdminDashboard(QMainWindow):
             QMessageBox.warning(self, "Invalid Input", "Stock must be a whole number and price must be a number.")
             return
         
-        # Add medication to database
-        add_medication(name, description, category, stock, price)
+        # Add medication to database; the dialog stays disabled until it is saved
+        dialog.setEnabled(False)
+        self.tasks.submit('save_medication', add_medication, name, description, category, stock, price,
+                          on_result=lambda medication_id: self.medication_saved(medication_id, dialog),
+                          on_error=lambda message: dialog.setEnabled(True))
+    
+    def medication_saved(self, medication_id, dialog):
+        """
+        Close the dialog of a newly saved medication
+        
+        The change watcher inserts just the new row and updates the cards.
+        """
+        if medication_id is None:
+            dialog.setEnabled(True)
+            QMessageBox.warning(self, "Error", "Failed to save the medication.")
+            return
         
-        # Reload medications data
-        self.load_medications_data()
+        self.watcher.poll()
         
         # Close dialog
         dialog.accept()
@@ -579,42 +664,129 @@ class AdminDashboard(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            # Delete from database
-            delete_medication(med_id)
-            
-            # Reload medications data
-            self.load_medications_data()
+            # Delete from database; the change watcher then removes just its row
+            self.tasks.submit('delete_medication', delete_medication, med_id,
+                              on_result=lambda deleted: self.medication_deleted(med_id, deleted))
+    
+    def medication_deleted(self, med_id, deleted):
+        """
+        Report a failed delete, or have the change watcher show a successful one
+        """
+        if not deleted:
+            QMessageBox.warning(self, "Error", "Failed to delete the medication.")
+            return
+        self.watcher.poll()
+    
+    def load_inventory_report(self):
+        """
+        Roll up new stock history and show the daily movement report
+        """
+        # Rollup days are UTC dates, like the stock_history timestamps
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        start_day = (today - datetime.timedelta(days=30)).isoformat()
+        
+        def build_report():
+            rollup_stock_history()
+            return get_stock_movement_report(start_day=start_day)
+        
+        self.tasks.submit('inventory_report', build_report, on_result=self.show_inventory_report)
+    
+    def show_inventory_report(self, report):
+        """
+        Fill the inventory report table with the rows loaded by load_inventory_report
+        """
+        self.inventory_report_table.setRowCount(len(report))
+        
+        for row, entry in enumerate(report):
+            values = [entry['day'], entry['name'] or f"#{entry['medication_id']}",
+                      str(entry['qty_in']), str(entry['qty_out']), f"{entry['net']:+d}", str(entry['events'])]
+            for col, value in enumerate(values):
+                self.inventory_report_table.setItem(row, col, QTableWidgetItem(value))
     
     def load_users_data(self):
         """
         Load users data from the database
         """
-        users = get_all_users()
-        
+        self.tasks.submit('users', get_all_users, on_result=self.show_users)
+    
+    def show_users(self, users):
+        """
+        Fill the users table with the rows loaded by load_users_data
+        """
         self.users_table.setRowCount(len(users))
         
         for row, user in enumerate(users):
-            # ID
-            id_item = QTableWidgetItem(str(user['id']))
-            self.users_table.setItem(row, 0, id_item)
-            
-            # Name
-            name_item = QTableWidgetItem(user['fullname'])
-            self.users_table.setItem(row, 1, name_item)
-            
-            # Username
-            username_item = QTableWidgetItem(user['username'])
-            self.users_table.setItem(row, 2, username_item)
-            
-            # Role
-            role_item = QTableWidgetItem(user['role'].capitalize())
-            self.users_table.setItem(row, 3, role_item)
-            
-            # Status
-            status = "Active" if user['active'] else "Inactive"
-            status_item = QTableWidgetItem(status)
-            status_item.setForeground(QColor("#4CAF50") if status == "Active" else QColor("#F44336"))
-            self.users_table.setItem(row, 4, status_item)
+            self.set_user_row(row, user)
+    
+    def set_user_row(self, row, user):
+        """
+        Fill one row of the users table
+        """
+        # ID
+        id_item = QTableWidgetItem(str(user['id']))
+        self.users_table.setItem(row, 0, id_item)
+        
+        # Name
+        name_item = QTableWidgetItem(user['fullname'])
+        self.users_table.setItem(row, 1, name_item)
+        
+        # Username
+        username_item = QTableWidgetItem(user['username'])
+        self.users_table.setItem(row, 2, username_item)
+        
+        # Role
+        role_item = QTableWidgetItem(user['role'].capitalize())
+        self.users_table.setItem(row, 3, role_item)
+        
+        # Status
+        status = "Active" if user['active'] else "Inactive"
+        status_item = QTableWidgetItem(status)
+        status_item.setForeground(QColor("#4CAF50") if status == "Active" else QColor("#F44336"))
+        self.users_table.setItem(row, 4, status_item)
+    
+    def user_row(self, user_id):
+        """
+        Find the row of the users table showing a user, or None
+        """
+        for row in range(self.users_table.rowCount()):
+            item = self.users_table.item(row, 0)
+            if item is not None and item.text() == str(user_id):
+                return row
+        return None
+    
+    def refresh_users(self, user_ids):
+        """
+        Re-read some users and update, add or remove just their rows
+        """
+        if self.tasks.is_busy('users'):
+            # The full load in flight may have read them before they changed
+            self.load_users_data()
+            return
+        
+        # A newer refresh re-reads these ids too, so replacing this one loses nothing
+        self.stale_user_ids.update(user_ids)
+        ids = list(self.stale_user_ids)
+        self.tasks.submit('users_refresh', get_users_by_ids, ids,
+                          on_result=lambda users: self.users_refreshed(ids, users))
+    
+    def users_refreshed(self, user_ids, users):
+        """
+        Apply the users re-read by refresh_users to their rows
+        """
+        self.stale_user_ids.difference_update(user_ids)
+        found = {user['id']: user for user in users}
+        for user_id in user_ids:
+            row = self.user_row(user_id)
+            user = found.get(user_id)
+            if user is None:
+                if row is not None:
+                    self.users_table.removeRow(row)
+            elif row is None:
+                row = self.users_table.rowCount()
+                self.users_table.insertRow(row)
+                self.set_user_row(row, user)
+            else:
+                self.set_user_row(row, user)
     
     def logout(self):
         """
@@ -3,14 +3,19 @@
 
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QLabel, QPushButton, QFrame, QTabWidget, 
-                           QTableWidget, QTableWidgetItem, QHeaderView,
-                           QMessageBox, QDialog, QFormLayout, QLineEdit,
-                           QComboBox, QApplication, QStackedWidget)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QIcon, QColor
+                           QHeaderView, QMessageBox, QDialog, QFormLayout, QLineEdit,
+                           QComboBox, QApplication, QStackedWidget, QTableView)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFont, QIcon
 
-from database import get_all_medications, get_medication_by_id, update_medication_stock
-from sql_connection import DatabaseConnection
+from database import (get_medication_by_id, update_medication_stock, dispense_stock,
+                     get_inventory_counters)
+from medication_model import PagedMedicationModel, attach_window_scrolling
+from db_tasks import TaskRunner, loading_label
+from change_watcher import ChangeWatcher
+from activity_feed import ActivityFeed
+from medication_picker import MedicationPicker
+from action_delegate import ActionButtonsDelegate
 from styles import StyleSheet
 
 
@@ -19,6 +24,9 @@ class PharmacistDashboard(QMainWindow):
     Pharmacist Dashboard for the Pharmacy Management System.
     Provides limited access to system features focused on inventory management.
     """
+    # Pause in typing before the inventory search runs
+    SEARCH_DELAY_MS = 250
+    
     def __init__(self, user_data):
         super().__init__()
         self.user_data = user_data
@@ -27,6 +35,11 @@ class PharmacistDashboard(QMainWindow):
         self.setMinimumSize(1200, 800)
         self.setStyleSheet(StyleSheet.MAIN_STYLE + StyleSheet.DASHBOARD_STYLE)
         
+        # Database calls run on a thread pool so a slow or locked database
+        # never freezes the window
+        self.tasks = TaskRunner(self)
+        self.tasks.failed.connect(self.on_task_failed)
+        
         # Create main widget and layout
         main_widget = QWidget()
         main_layout = QVBoxLayout(main_widget)
@@ -133,12 +146,12 @@ class PharmacistDashboard(QMainWindow):
         
         card1_title = QLabel("Total Medications")
         card1_title.setFont(QFont("Arial", 14))
-        card1_value = QLabel("342")
-        card1_value.setFont(QFont("Arial", 24, QFont.Bold))
-        card1_value.setAlignment(Qt.AlignCenter)
+        self.card1_value = QLabel("…")
+        self.card1_value.setFont(QFont("Arial", 24, QFont.Bold))
+        self.card1_value.setAlignment(Qt.AlignCenter)
         
         card1_layout.addWidget(card1_title)
-        card1_layout.addWidget(card1_value)
+        card1_layout.addWidget(self.card1_value)
         cards_layout.addWidget(card1)
         
         # Card 2: Low Stock Items
@@ -148,12 +161,12 @@ class PharmacistDashboard(QMainWindow):
         
         card2_title = QLabel("Low Stock Items")
         card2_title.setFont(QFont("Arial", 14))
-        card2_value = QLabel("28")
-        card2_value.setFont(QFont("Arial", 24, QFont.Bold))
-        card2_value.setAlignment(Qt.AlignCenter)
+        self.card2_value = QLabel("…")
+        self.card2_value.setFont(QFont("Arial", 24, QFont.Bold))
+        self.card2_value.setAlignment(Qt.AlignCenter)
         
         card2_layout.addWidget(card2_title)
-        card2_layout.addWidget(card2_value)
+        card2_layout.addWidget(self.card2_value)
         cards_layout.addWidget(card2)
         
         # Card 3: Out of Stock
@@ -163,12 +176,12 @@ class PharmacistDashboard(QMainWindow):
         
         card3_title = QLabel("Out of Stock")
         card3_title.setFont(QFont("Arial", 14))
-        card3_value = QLabel("15")
-        card3_value.setFont(QFont("Arial", 24, QFont.Bold))
-        card3_value.setAlignment(Qt.AlignCenter)
+        self.card3_value = QLabel("…")
+        self.card3_value.setFont(QFont("Arial", 24, QFont.Bold))
+        self.card3_value.setAlignment(Qt.AlignCenter)
         
         card3_layout.addWidget(card3_title)
-        card3_layout.addWidget(card3_value)
+        card3_layout.addWidget(self.card3_value)
         cards_layout.addWidget(card3)
         
         # Recent Activity
@@ -179,28 +192,15 @@ class PharmacistDashboard(QMainWindow):
         activity_title = QLabel("Recent Activity")
         activity_title.setFont(QFont("Arial", 16, QFont.Bold))
         
-        activity_table = QTableWidget(5, 3)
-        activity_table.setHorizontalHeaderLabels(["Time", "Medication", "Activity"])
-        activity_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        
-        # Sample data
-        activities = [
-            ["10:30 AM", "Amoxicillin 500mg", "Updated stock: +50"],
-            ["09:45 AM", "Paracetamol 500mg", "Dispensed: -20"],
-            ["09:30 AM", "Ibuprofen 400mg", "Updated stock: +100"],
-            ["Yesterday", "Metformin 850mg", "Noted low stock"],
-            ["Yesterday", "Atorvastatin 20mg", "Dispensed: -30"]
-        ]
-        
-        for row, activity in enumerate(activities):
-            for col, data in enumerate(activity):
-                item = QTableWidgetItem(data)
-                if col == 0:
-                    item.setFont(QFont("Arial", 10, QFont.Bold))
-                activity_table.setItem(row, col, item)
+        # Newest stock changes, topped up as the change watcher reports writes
+        self.activity_feed = ActivityFeed(self.tasks, ['time', 'medication', 'activity'])
+        self.activity_feed.reload()
         
         activity_layout.addWidget(activity_title)
-        activity_layout.addWidget(activity_table)
+        activity_layout.addWidget(self.activity_feed)
+        
+        # Fill the cards with live counts
+        self.update_dashboard_cards()
         
         # Add widgets to dashboard layout
         dashboard_layout.addWidget(dashboard_title)
@@ -221,9 +221,16 @@ class PharmacistDashboard(QMainWindow):
         search_box.setPlaceholderText("Search medications...")
         search_box.setMinimumHeight(40)
         search_box.setMaximumWidth(300)
-        search_box.textChanged.connect(lambda text: self.filter_medicines(text))
+        
+        # Query once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(lambda: self.filter_medicines(search_box.text()))
+        search_box.textChanged.connect(self.search_timer.start)
         
         inventory_header.addWidget(inventory_title)
+        inventory_header.addWidget(loading_label(self.tasks, 'inventory', 'medication', 'save_stock'))
         inventory_header.addStretch()
         inventory_header.addWidget(search_box)
 
@@ -240,10 +247,17 @@ class PharmacistDashboard(QMainWindow):
 
            
         # Inventory table
-        self.inventory_table = QTableWidget()
+        self.inventory_model = PagedMedicationModel(['id', 'name', 'category', 'stock', 'status', 'actions'],
+                                                    runner=self.tasks, task_key='inventory', parent=self)
+        self.inventory_table = QTableView()
         self.inventory_table.setObjectName("dataTable")
-        self.inventory_table.setColumnCount(6)
-        self.inventory_table.setHorizontalHeaderLabels(["ID", "Name", "Category", "Stock", "Status", "Actions"])
+        self.inventory_table.setModel(self.inventory_model)
+        attach_window_scrolling(self.inventory_table, self.inventory_model)
+        
+        # The Update Stock button is painted by a delegate, not created per row
+        inventory_actions = ActionButtonsDelegate([('update', "Update Stock", "editButton")], self.inventory_table)
+        inventory_actions.clicked.connect(lambda action, med_id: self.update_stock(med_id))
+        self.inventory_table.setItemDelegateForColumn(self.inventory_model.column_of('actions'), inventory_actions)
         self.inventory_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.inventory_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
         self.inventory_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
@@ -273,14 +287,15 @@ class PharmacistDashboard(QMainWindow):
         medication_form = QFormLayout()
         medication_form.setVerticalSpacing(20)
         
-        # Medication selector
-        medication_combo = QComboBox()
-        medication_combo.setMinimumHeight(40)
-        medications = get_all_medications()
-        for med in medications:
-            if med['stock'] > 0:  # Only show medications in stock
-                medication_combo.addItem(f"{med['name']} ({med['stock']} in stock)", med['id'])
-        medication_form.addRow("Medication:", medication_combo)
+        # Medication selector: searches as the user types instead of listing everything
+        self.medication_picker = MedicationPicker(self.tasks, in_stock=True)
+        self.medication_picker.setMinimumHeight(40)
+        self.medication_picker.medication_selected.connect(self.show_selected_stock)
+        medication_form.addRow("Medication:", self.medication_picker)
+        
+        # Stock of the selected medication
+        self.selected_stock_label = QLabel("")
+        medication_form.addRow("", self.selected_stock_label)
         
         # Quantity
         quantity_input = QLineEdit()
@@ -327,7 +342,7 @@ class PharmacistDashboard(QMainWindow):
         
         # Connect the dispense button
         dispense_button.clicked.connect(lambda: self.dispense_medication(
-            medication_combo.currentData(),
+            self.medication_picker.medication['id'] if self.medication_picker.medication else None,
             quantity_input.text(),
             customer_input.text(),
             doctor_input.text(),
@@ -336,7 +351,11 @@ class PharmacistDashboard(QMainWindow):
         ))
         
         # Add widgets to dispense layout
-        dispense_layout.addWidget(dispense_title)
+        dispense_header = QHBoxLayout()
+        dispense_header.addWidget(dispense_title)
+        dispense_header.addWidget(loading_label(self.tasks, 'medication_picker', 'dispense'))
+        dispense_header.addStretch()
+        dispense_layout.addLayout(dispense_header)
         dispense_layout.addWidget(dispense_form_container, alignment=Qt.AlignCenter)
         dispense_layout.addStretch()
         
@@ -426,43 +445,81 @@ class PharmacistDashboard(QMainWindow):
         
         # Set central widget
         self.setCentralWidget(main_widget)
+        
+        # Follow stock changes made from other terminals as well as this one
+        self.watcher = ChangeWatcher(self.tasks, parent=self)
+        self.watcher.medications_changed.connect(self.on_medications_changed)
+        self.watcher.start()
     
 
     def filter_medicines(self, text):
-        for row in range(self.inventory_table.rowCount()):
-            match = False
-            for col in range(self.inventory_table.columnCount()):
-                item = self.inventory_table.item(row, col)
-                if item and text.lower() in item.text().lower():
-                    match = True
-                    break
-            self.inventory_table.setRowHidden(row, not match)
+        """
+        Show only the inventory matching the search text
+        
+        The filter runs in the database and the table reloads from its first
+        page, so it covers every medication, not just the rows loaded so far.
+        """
+        filters = {'search': text} if text.strip() else None
+        if filters != self.inventory_model.filters:
+            self.inventory_model.set_filters(filters)
 
 
 
+    def on_task_failed(self, key, message):
+        """
+        Report a background database call that raised
+        """
+        QMessageBox.warning(self, "Database Error", message)
+    
+    def closeEvent(self, event):
+        # Results arriving after the window closed would touch deleted widgets
+        self.watcher.stop()
+        self.tasks.cancel_all()
+        super().closeEvent(event)
+    
     def update_dashboard_cards(self):
-            try:
-                conn = DatabaseConnection.get_connection()
-                cursor = conn.cursor()
-
-                # Total Medications
-                cursor.execute("SELECT COUNT(*) FROM products")
-                total = cursor.fetchone()[0]
-                self.card1_value.setText(str(total))
-
-                # Low Stock
-                cursor.execute("SELECT COUNT(*) FROM products WHERE Quantity <= 10 AND Quantity > 0")
-                low_stock = cursor.fetchone()[0]
-                self.card2_value.setText(str(low_stock))
-
-                # Out of Stock
-                cursor.execute("SELECT COUNT(*) FROM products WHERE Quantity <= 0")
-                out_stock = cursor.fetchone()[0]
-                self.card3_value.setText(str(out_stock))
-
-            except Exception as e:
-                print("Dashboard stats error:", e)
-
+        """
+        Refresh the dashboard cards from the trigger-maintained inventory counters
+        """
+        self.tasks.submit('cards', get_inventory_counters, on_result=self.show_dashboard_cards)
+    
+    def show_dashboard_cards(self, counters):
+        """
+        Fill the dashboard cards with the counters loaded by update_dashboard_cards
+        """
+        self.card1_value.setText(str(counters['total_medications']))
+        self.card2_value.setText(str(counters['low_stock']))
+        self.card3_value.setText(str(counters['out_of_stock']))
+    
+    def on_medications_changed(self, medication_ids):
+        """
+        Show medication changes reported by the change watcher
+        
+        Args:
+            medication_ids (List[int]): Changed medications, or None if
+                everything has to be reloaded
+        """
+        self.update_dashboard_cards()
+        if medication_ids is None:
+            self.load_inventory_data()
+            self.activity_feed.reload()
+        else:
+            self.inventory_model.refresh_medications(medication_ids)
+            self.activity_feed.refresh()
+        
+        selected = self.medication_picker.medication
+        if selected is not None and (medication_ids is None or selected['id'] in medication_ids):
+            self.medication_picker.refresh()
+    
+    def show_selected_stock(self, medication):
+        """
+        Show the current stock of the medication chosen in the dispense picker
+        """
+        if medication is None:
+            self.selected_stock_label.setText("")
+        else:
+            self.selected_stock_label.setText(f"{medication['stock']} in stock")
+    
     def change_page(self, index):
         """
         Change the active page in the dashboard
@@ -479,66 +536,21 @@ class PharmacistDashboard(QMainWindow):
     
     def load_inventory_data(self):
         """
-        Load inventory data from the database
+        Load the first page of inventory; later pages load as the table scrolls
         """
-        medications = get_all_medications()
-        
-        self.inventory_table.setRowCount(len(medications))
-        
-        for row, med in enumerate(medications):
-            # ID
-            id_item = QTableWidgetItem(str(med['id']))
-            self.inventory_table.setItem(row, 0, id_item)
-            
-            # Name
-            name_item = QTableWidgetItem(med['name'])
-            self.inventory_table.setItem(row, 1, name_item)
-            
-            # Category
-            category_item = QTableWidgetItem(med['category'])
-            self.inventory_table.setItem(row, 2, category_item)
-            
-            # Stock
-            stock_item = QTableWidgetItem(str(med['stock']))
-            self.inventory_table.setItem(row, 3, stock_item)
-            
-            # Status
-            status = "In Stock"
-            status_color = QColor("#4CAF50")  # Green
-            
-            if med['stock'] <= 0:
-                status = "Out of Stock"
-                status_color = QColor("#F44336")  # Red
-            elif med['stock'] <= 10:
-                status = "Low Stock"
-                status_color = QColor("#FFC107")  # Amber
-                
-            status_item = QTableWidgetItem(status)
-            status_item.setForeground(status_color)
-            self.inventory_table.setItem(row, 4, status_item)
-            
-            # Actions
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout(actions_widget)
-            actions_layout.setContentsMargins(0, 0, 0, 0)
-            actions_layout.setSpacing(5)
-            
-            update_btn = QPushButton("Update Stock")
-            update_btn.setObjectName("editButton")
-            update_btn.setMaximumWidth(100)
-            update_btn.clicked.connect(lambda _, med_id=med['id']: self.update_stock(med_id))
-            
-            actions_layout.addWidget(update_btn)
-            
-            self.inventory_table.setCellWidget(row, 5, actions_widget)
+        self.inventory_model.reload()
     
     def update_stock(self, med_id):
         """
         Show dialog to update medication stock
         """
-        # Get medication data
-        medication = get_medication_by_id(med_id)
-        
+        # Get medication data; the dialog opens once it has loaded
+        self.tasks.submit('medication', get_medication_by_id, med_id, on_result=self.show_stock_dialog)
+    
+    def show_stock_dialog(self, medication):
+        """
+        Show the stock update dialog for a medication loaded by update_stock
+        """
         if not medication:
             QMessageBox.warning(self, "Error", "Medication not found.")
             return
@@ -629,11 +641,26 @@ class PharmacistDashboard(QMainWindow):
                 QMessageBox.warning(self, "Invalid Input", f"Cannot remove {quantity} items. Only {current_stock} available.")
                 return
         
-        # Update the stock
-        update_medication_stock(medication['id'], new_stock, reason)
+        # Update the stock; the dialog stays disabled until it is saved
+        dialog.setEnabled(False)
+        self.tasks.submit('save_stock', update_medication_stock, medication['id'], new_stock, reason,
+                          self.user_data.get('id'),
+                          on_result=lambda updated: self.stock_saved(updated, dialog),
+                          on_error=lambda message: dialog.setEnabled(True))
+    
+    def stock_saved(self, updated, dialog):
+        """
+        Close the dialog of a saved stock update
         
-        # Reload inventory data
-        self.load_inventory_data()
+        The change watcher repaints just the affected row, the picked stock,
+        the cards and the activity feed.
+        """
+        if not updated:
+            dialog.setEnabled(True)
+            QMessageBox.warning(self, "Error", "Failed to update the stock.")
+            return
+        
+        self.watcher.poll()
         
         # Close dialog
         dialog.accept()
@@ -642,6 +669,10 @@ class PharmacistDashboard(QMainWindow):
         """
         Dispense medication to a customer
         """
+        # Ignore repeated clicks while a dispense is being saved
+        if self.tasks.is_busy('dispense'):
+            return
+        
         # Validate input
         if not med_id:
             self.show_error(error_label, "Please select a medication.")
@@ -659,35 +690,31 @@ class PharmacistDashboard(QMainWindow):
             self.show_error(error_label, "Quantity must be a valid positive number.")
             return
             
-        # Get medication data
-        medication = get_medication_by_id(med_id)
-        
-        if not medication:
-            self.show_error(error_label, "Medication not found.")
-            return
-            
-        # Check stock
-        if quantity > medication['stock']:
-            self.show_error(error_label, f"Not enough stock. Only {medication['stock']} available.")
-            return
-            
-        # Update stock
-        new_stock = medication['stock'] - quantity
+        # Take the stock out in one guarded update
         reason = f"Dispensed to customer: {customer}"
         if notes:
             reason += f" - {notes}"
             
-        update_medication_stock(med_id, new_stock, reason)
+        self.tasks.submit('dispense', dispense_stock, med_id, quantity, reason, self.user_data.get('id'),
+                          on_result=lambda result: self.medication_dispensed(result, quantity, customer, error_label))
+    
+    def medication_dispensed(self, result, quantity, customer, error_label):
+        """
+        Report the outcome of a dispense submitted by dispense_medication
+        """
+        if not result['success']:
+            self.show_error(error_label, result['error'])
+            return
         
         # Show success and reset
         QMessageBox.information(self, "Success", 
-            f"Successfully dispensed {quantity} units of {medication['name']} to {customer}.")
+            f"Successfully dispensed {quantity} units of {result['name']} to {customer}.")
             
         # Reset form fields (we'd need to modify the function parameters to include the form widgets)
         error_label.setVisible(False)
         
-        # Reload inventory data
-        self.load_inventory_data()
+        # The change watcher shows the new stock
+        self.watcher.poll()
     
     def show_error(self, error_label, message):
         """
@@ -2,65 +2,620 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
+import csv
+import json
+import time
 import sqlite3
 import hashlib
 import datetime
-from typing import Dict, List, Optional, Union, Tuple
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union, Tuple
+
+# Connection profiles applied by Database.connect. Select one per deployment
+# with the PHARMACY_DB_PROFILE environment variable (default: "standard").
+#   cache_size is in KiB when negative (SQLite convention), mmap_size in bytes,
+#   busy_timeout in milliseconds.
+CONNECTION_PROFILES = {
+    # WAL lets dashboards keep reading while a dispense commits, and
+    # synchronous=NORMAL only fsyncs at checkpoints instead of every commit.
+    'standard': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    # Busy counters with several terminals sharing one database file.
+    'high_concurrency': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 15000,
+    },
+    # Database on a network share, where WAL and mmap are not safe.
+    'network_share': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 15000,
+    },
+}
+
+DEFAULT_PROFILE = 'standard'
+
+
+def get_connection_profile(name: Optional[str] = None) -> Dict:
+    """
+    Resolve a connection profile by name
+    
+    Args:
+        name (str, optional): Profile name. Falls back to the PHARMACY_DB_PROFILE
+            environment variable, then to DEFAULT_PROFILE.
+    
+    Returns:
+        Dict: Pragma settings of the profile
+    """
+    name = name or os.environ.get('PHARMACY_DB_PROFILE') or DEFAULT_PROFILE
+    if name not in CONNECTION_PROFILES:
+        raise ValueError(f"Unknown database profile: {name}")
+    return CONNECTION_PROFILES[name]
+
+
+def apply_connection_profile(conn: sqlite3.Connection, profile: Dict):
+    """
+    Apply the pragmas of a connection profile to an open connection
+    """
+    # busy_timeout first so switching the journal mode waits for other writers
+    conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+    conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+
+# Most connections Database keeps in its pool for connection() blocks
+POOL_SIZE = 4
+
+# Seconds connection() waits for a pooled connection to come free
+POOL_TIMEOUT = 30
+
+class _Connection(sqlite3.Connection):
+    """
+    sqlite3 connection that can carry per-connection state, such as the
+    data_version MedicationCatalog last checked on it
+    """
+
+class _ThreadOwner:
+    """
+    Sentinel kept in a thread's local data; collecting it closes the thread's connection
+    """
 
 class Database:
     """
-    Singleton database class to manage database connections and operations
+    Singleton database class to manage database connections and operations.
+    
+    Connections are never shared between threads. connection() checks one out
+    of a bounded pool for the duration of a block and returns it afterwards,
+    so background workers reuse a few open connections however many tasks
+    they run. Outside such a block, connect() opens a connection bound to the
+    calling thread, e.g. the GUI thread, which is closed once that thread's
+    local data goes away.
     """
     _instance = None
+    _instance_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(Database, cls).__new__(cls)
-            cls._instance.conn = None
-            cls._instance.cursor = None
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(Database, cls).__new__(cls)
+                    instance.db_path = os.environ.get('PHARMACY_DB_PATH') or os.path.join(
+                        os.path.dirname(os.path.abspath(__file__)), 'pharmacy.db')
+                    instance.profile = None
+                    instance.pool_size = POOL_SIZE
+                    instance._local = threading.local()
+                    instance._connections = set()  # connections bound to a thread
+                    instance._pooled = set()  # pool connections, idle or checked out
+                    instance._idle = []  # pool connections free to check out, newest last
+                    instance._opening = 0  # pool connections being opened
+                    instance._pool_lock = threading.Condition()
+                    cls._instance = instance
         return cls._instance
     
-    def connect(self):
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        """
+        Connection the calling thread is using, or None if it has none
+        """
+        return getattr(self._local, 'conn', None)
+    
+    def _open(self) -> sqlite3.Connection:
+        """
+        Open a new connection with the current profile applied
+        """
+        # Create database directory if it doesn't exist
+        db_dir = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        
+        if self.profile is None:
+            self.profile = get_connection_profile()
+        
+        # Connect to database. A connection is only used by one thread at a
+        # time, but pool connections move between worker threads and
+        # close_all() closes every connection, so check_same_thread is disabled.
+        conn = sqlite3.connect(self.db_path, timeout=self.profile['busy_timeout'] / 1000,
+                               check_same_thread=False, factory=_Connection)
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        apply_connection_profile(conn, self.profile)
+        return conn
+    
+    def connect(self, profile: Optional[str] = None) -> sqlite3.Connection:
         """
-        Connect to the SQLite database
+        Get the calling thread's connection, opening one bound to the thread if needed
+        
+        Args:
+            profile (str, optional): Name of the connection profile to apply,
+                see CONNECTION_PROFILES
+        
+        Returns:
+            sqlite3.Connection: The calling thread's connection
         """
-        if self.conn is None:
-            # Create database directory if it doesn't exist
-            db_dir = os.path.dirname(os.path.abspath(__file__))
-            os.makedirs(db_dir, exist_ok=True)
+        conn = self.conn
+        if conn is None:
+            if profile is not None:
+                self.profile = get_connection_profile(profile)
+            conn = self._open()
+            with self._pool_lock:
+                self._connections.add(conn)
             
-            # Connect to database
-            db_path = os.path.join(db_dir, 'pharmacy.db')
-            self.conn = sqlite3.connect(db_path)
-            self.conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-            self.cursor = self.conn.cursor()
+            # Only the thread's own local data refers to the owner, so it is
+            # collected, and the connection closed, when the thread goes away
+            owner = _ThreadOwner()
+            weakref.finalize(owner, self._close_thread_connection, conn)
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.owner = owner
+        return conn
+    
+    def _close_thread_connection(self, conn: sqlite3.Connection):
+        with self._pool_lock:
+            if conn not in self._connections:
+                # Already closed by close() or close_all()
+                return
+            self._connections.discard(conn)
+        conn.close()
+    
+    @contextmanager
+    def connection(self):
+        """
+        Check a pooled connection out for the calling thread for the duration of a block
+        
+        Every call the thread makes inside the block uses the checked-out
+        connection. Afterwards it goes back to the pool, rolled back if a
+        transaction was left open. When all pool_size connections are checked
+        out this waits up to POOL_TIMEOUT seconds. A thread that already has a
+        connection keeps using it.
+        
+        Yields:
+            sqlite3.Connection: The checked-out connection
+        """
+        if self.conn is not None:
+            yield self.conn
+            return
+        
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 0
+        try:
+            yield conn
+        finally:
+            if self._local.conn is conn:
+                self._local.conn = None
+            self._checkin(conn)
+    
+    def _checkout(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + POOL_TIMEOUT
+        with self._pool_lock:
+            while not self._idle and len(self._pooled) + self._opening >= self.pool_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"No pooled database connection came free in {POOL_TIMEOUT} seconds")
+                self._pool_lock.wait(remaining)
+            
+            if self._idle:
+                return self._idle.pop()
+            self._opening += 1
+        
+        # Open outside the lock; applying the profile can wait on busy_timeout
+        try:
+            conn = self._open()
+        except BaseException:
+            with self._pool_lock:
+                self._opening -= 1
+                self._pool_lock.notify()
+            raise
+        
+        with self._pool_lock:
+            self._opening -= 1
+            self._pooled.add(conn)
+        return conn
+    
+    def _checkin(self, conn: sqlite3.Connection):
+        with self._pool_lock:
+            pooled = conn in self._pooled
+        
+        if pooled and conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                with self._pool_lock:
+                    self._pooled.discard(conn)
+                    self._pool_lock.notify()
+                pooled = False
+        
+        with self._pool_lock:
+            if pooled and conn in self._pooled:
+                self._idle.append(conn)
+                self._pool_lock.notify()
+                return
+        
+        # Dropped from the pool by close() or close_all() while checked out
+        conn.close()
+    
+    @contextmanager
+    def get_cursor(self):
+        """
+        Yield a fresh cursor on the calling thread's connection and close it afterwards
+        """
+        cursor = self.connect().cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+    
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """
+        Yield a cursor inside a transaction on the calling thread's connection.
+        
+        The outermost block begins the transaction, so its reads and writes
+        are one atomic unit, and commits on success or rolls back on error;
+        nested blocks join the enclosing transaction.
+        
+        Args:
+            immediate (bool): Begin with BEGIN IMMEDIATE, taking the write lock
+                up front. Use it for read-then-write work, so no other
+                connection can commit between the read and the write.
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        self._local.depth += 1
+        try:
+            if self._local.depth == 1 and not conn.in_transaction:
+                cursor.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+            yield cursor
+            if self._local.depth == 1:
+                conn.commit()
+        except BaseException:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+            cursor.close()
     
     def close(self):
         """
-        Close the database connection
+        Close the calling thread's database connection
+        
+        A connection checked out with connection() is dropped from the pool
+        rather than returned to it.
         """
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.cursor = None
+        conn = self.conn
+        if conn:
+            with self._pool_lock:
+                self._connections.discard(conn)
+                if conn in self._pooled:
+                    self._pooled.discard(conn)
+                    self._pool_lock.notify()
+            conn.close()
+            self._local.conn = None
+            self._local.owner = None
+    
+    def close_all(self):
+        """
+        Close every connection, e.g. when the application exits
+        
+        This is the only place a thread's connection is closed by another
+        thread. Pool connections checked out at the time are closed when
+        they are returned.
+        """
+        with self._pool_lock:
+            connections = list(self._connections) + self._idle
+            self._connections.clear()
+            self._pooled.clear()
+            self._idle = []
+            self._pool_lock.notify_all()
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+        self._local.owner = None
     
     def commit(self):
         """
-        Commit changes to the database
+        Commit changes on the calling thread's connection
         """
         if self.conn:
             self.conn.commit()
 
-# Create database tables
-def init_database():
+# Most medications MedicationCatalog keeps; the least recently used go first
+CATALOG_SIZE = 5000
+
+class MedicationCatalog:
     """
-    Initialize the database and create tables if they don't exist
+    Singleton in-process read-through cache of medications by id.
+    
+    get() serves a medication from memory unless it may have changed since it
+    was cached, in which case it is read again. The functions in this module
+    that write medications drop what they changed after they commit, and
+    add_medication caches the row it inserted.
+    
+    Staleness is checked on the calling connection. PRAGMA data_version only
+    moves when another connection commits, and its values are only comparable
+    within one connection, so each connection carries the value it last
+    checked. While that value is unchanged the cache is current for it. When
+    it has moved, the change_log entries the cache has not seen yet name
+    exactly which medications to drop.
+    
+    Cached medication dicts are shared and must be treated as read-only;
+    updates replace them rather than mutating them.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(MedicationCatalog, cls).__new__(cls)
+                    instance._lock = threading.Lock()
+                    instance._medications = OrderedDict()  # id -> medication, least recently used first
+                    instance._seq = None  # newest change_log seq accounted for, None before the first sync
+                    instance._written = {}  # id -> change_log seq its write-through reflects
+                    instance._generation = 0  # bumped whenever an entry is written or dropped
+                    cls._instance = instance
+        return cls._instance
+    
+    def _sync(self, conn: sqlite3.Connection):
+        """
+        Drop medications other connections changed since conn last checked
+        """
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if getattr(conn, 'catalog_version', None) == version:
+            return
+        
+        with self._lock:
+            seq = self._seq
+        # data_version is read before the bounds, so a commit in between only costs another sync
+        oldest, newest = conn.execute('SELECT MIN(seq), MAX(seq) FROM change_log').fetchone()
+        newest = newest or 0
+        changes = []
+        if seq is not None and newest > seq:
+            changes = conn.execute(
+                "SELECT seq, row_id FROM change_log WHERE seq > ? AND seq <= ? AND table_name = 'medications'",
+                (seq, newest)
+            ).fetchall()
+        
+        with self._lock:
+            if seq is None or (oldest is not None and oldest > seq + 1):
+                # Never synced, or the entries since the last sync were pruned
+                self._medications.clear()
+                self._written.clear()
+                self._generation += 1
+            elif changes:
+                # A get() that read before these changes must not cache its row
+                self._generation += 1
+                for change_seq, medication_id in changes:
+                    # A put() at or after this change already shows it
+                    if self._written.get(medication_id, 0) < change_seq:
+                        self._medications.pop(medication_id, None)
+            self._seq = max(self._seq or 0, newest)
+            self._written = {medication_id: written for medication_id, written in self._written.items()
+                             if written > self._seq}
+        conn.catalog_version = version
+    
+    def _store(self, medication: Dict):
+        """
+        Cache a medication, dropping the least recently used beyond CATALOG_SIZE (lock held)
+        """
+        self._medications[medication['id']] = medication
+        self._medications.move_to_end(medication['id'])
+        while len(self._medications) > CATALOG_SIZE:
+            self._medications.popitem(last=False)
+    
+    def get(self, medication_id: int) -> Optional[Dict]:
+        """
+        Get one medication, from the cache when it is current
+        """
+        conn = Database().connect()
+        if conn.in_transaction:
+            # Its own uncommitted writes do not move data_version
+            row = conn.execute('SELECT * FROM medications WHERE id = ?', (medication_id,)).fetchone()
+            return dict(row) if row else None
+        
+        self._sync(conn)
+        with self._lock:
+            medication = self._medications.get(medication_id)
+            if medication is not None:
+                self._medications.move_to_end(medication_id)
+                return medication
+            generation = self._generation
+        
+        row = conn.execute('SELECT * FROM medications WHERE id = ?', (medication_id,)).fetchone()
+        if row is None:
+            return None
+        medication = dict(row)
+        with self._lock:
+            # A write or drop in the meantime may be newer than this read
+            if self._generation == generation:
+                self._store(medication)
+        return medication
+    
+    def put(self, medication: Dict, seq: int):
+        """
+        Cache a medication that was just inserted, as of its change_log seq
+        
+        Once a sync has accounted for changes past seq, a newer change may
+        already have dropped the entry, which the insert must not bring back.
+        """
+        with self._lock:
+            self._generation += 1
+            if self._seq is None or self._seq > seq:
+                return
+            self._written[medication['id']] = seq
+            self._store(medication)
+    
+    def remove(self, medication_id: int):
+        """
+        Drop a medication that was just changed or deleted
+        """
+        with self._lock:
+            self._generation += 1
+            self._medications.pop(medication_id, None)
+    
+    def invalidate(self):
+        """
+        Drop every cached medication, e.g. after a bulk write
+        """
+        with self._lock:
+            self._generation += 1
+            self._medications.clear()
+            self._written.clear()
+
+def _change_log_seq(cursor: sqlite3.Cursor) -> int:
+    """
+    Get the newest change_log seq; inside a write transaction, that of its own last change
+    """
+    cursor.execute('SELECT MAX(seq) FROM change_log')
+    return cursor.fetchone()[0] or 0
+
+# Secondary indexes managed by the schema code: (index name, table, columns)
+INDEXES = (
+    ('idx_medications_name', 'medications', 'name'),
+    ('idx_medications_category', 'medications', 'category'),
+    ('idx_medications_stock', 'medications', 'stock'),
+    ('idx_stock_history_medication', 'stock_history', 'medication_id, timestamp'),
+    ('idx_users_role_active', 'users', 'role, active'),
+)
+
+# Hot queries and the index each one is expected to use: (sql, params, index name)
+HOT_QUERIES = (
+    ('SELECT * FROM stock_history WHERE medication_id = ? ORDER BY timestamp DESC',
+     (1,), 'idx_stock_history_medication'),
+    ('DELETE FROM stock_history WHERE medication_id = ?',
+     (1,), 'idx_stock_history_medication'),
+    ('SELECT COUNT(*) FROM medications WHERE stock <= 10 AND stock > 0',
+     (), 'idx_medications_stock'),
+    ('SELECT COUNT(*) FROM medications WHERE stock <= 0',
+     (), 'idx_medications_stock'),
+    ('SELECT id, name FROM medications WHERE category = ?',
+     ('Analgesics',), 'idx_medications_category'),
+    ('SELECT id, name FROM medications ORDER BY name, id LIMIT 500',
+     (), 'idx_medications_name'),
+    ('SELECT COUNT(*) FROM users WHERE role = ? AND active = 1',
+     ('pharmacist',), 'idx_users_role_active'),
+    ('SELECT COUNT(*) FROM users WHERE role = ?',
+     ('admin',), 'idx_users_role_active'),
+)
+
+def ensure_indexes(cursor: sqlite3.Cursor):
+    """
+    Create any missing secondary index listed in INDEXES
+    """
+    for name, table, columns in INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+
+def check_query_plans() -> List[Dict]:
+    """
+    Confirm that the hot queries are planned with their expected index
+    
+    Returns:
+        List[Dict]: One entry per query in HOT_QUERIES with 'query', 'index',
+            'plan' (the EXPLAIN QUERY PLAN details) and 'uses_index'
     """
     db = Database()
-    db.connect()
+    report = []
+    
+    with db.get_cursor() as cursor:
+        for query, params, index in HOT_QUERIES:
+            cursor.execute(f'EXPLAIN QUERY PLAN {query}', params)
+            plan = [row['detail'] for row in cursor.fetchall()]
+            report.append({
+                'query': query,
+                'index': index,
+                'plan': plan,
+                'uses_index': any(f'INDEX {index}' in detail for detail in plan),
+            })
+    
+    return report
+
+# Sample medications inserted into a freshly created database
+SAMPLE_MEDICATIONS = (
+    ('Amoxicillin 500mg', 'Antibiotic capsules', 'Antibiotics', 100, 12.99),
+    ('Paracetamol 500mg', 'Pain reliever tablets', 'Analgesics', 200, 5.99),
+    ('Ibuprofen 400mg', 'Anti-inflammatory tablets', 'Analgesics', 150, 6.99),
+    ('Metformin 850mg', 'Anti-diabetic tablets', 'Diabetic', 80, 15.99),
+    ('Atorvastatin 20mg', 'Cholesterol lowering tablets', 'Cardiovascular', 120, 22.99),
+    ('Cetirizine 10mg', 'Antihistamine tablets', 'Allergy', 90, 9.99),
+    ('Omeprazole 20mg', 'Proton pump inhibitor', 'Gastrointestinal', 70, 14.99),
+    ('Amlodipine 5mg', 'Calcium channel blocker', 'Cardiovascular', 100, 18.99)
+)
+
+def seed_sample_data(cursor: Optional[sqlite3.Cursor] = None) -> bool:
+    """
+    Add the sample medications if the medications table is empty
+    
+    Args:
+        cursor (sqlite3.Cursor, optional): Cursor of an open transaction to use
+    
+    Returns:
+        bool: True if sample data was inserted
+    """
+    if cursor is None:
+        with Database().transaction(immediate=True) as cursor:
+            seeded = seed_sample_data(cursor)
+        MedicationCatalog().invalidate()
+        return seeded
+    
+    cursor.execute('SELECT 1 FROM medications LIMIT 1')
+    if cursor.fetchone():
+        return False
+    
+    cursor.executemany(
+        'INSERT INTO medications (name, description, category, stock, price) VALUES (?, ?, ?, ?, ?)',
+        SAMPLE_MEDICATIONS
+    )
+    return True
+
+def _migration_001_base_schema(cursor: sqlite3.Cursor):
+    """
+    Create the users, medications and stock_history tables and the default admin
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'medications'")
+    fresh_database = cursor.fetchone() is None
     
     # Create users table
-    db.cursor.execute('''
+    cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         username TEXT UNIQUE NOT NULL,
@@ -75,7 +630,7 @@ def init_database():
     ''')
     
     # Create medications table
-    db.cursor.execute('''
+    cursor.execute('''
     CREATE TABLE IF NOT EXISTS medications (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
@@ -89,7 +644,7 @@ def init_database():
     ''')
     
     # Create stock_history table
-    db.cursor.execute('''
+    cursor.execute('''
     CREATE TABLE IF NOT EXISTS stock_history (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         medication_id INTEGER,
@@ -104,37 +659,248 @@ def init_database():
     ''')
     
     # Create admin user if none exists
-    db.cursor.execute('SELECT COUNT(*) FROM users WHERE role = ?', ('admin',))
-    if db.cursor.fetchone()[0] == 0:
+    cursor.execute('SELECT COUNT(*) FROM users WHERE role = ?', ('admin',))
+    if cursor.fetchone()[0] == 0:
         # Create default admin user
         password_hash = hash_password('admin123')
-        db.cursor.execute(
+        cursor.execute(
             'INSERT INTO users (username, password, fullname, email, phone, role) VALUES (?, ?, ?, ?, ?, ?)',
             ('admin', password_hash, 'System Administrator', 'admin@pharmacy.com', '123-456-7890', 'admin')
         )
     
-    # Add some sample medications if none exist
-    db.cursor.execute('SELECT COUNT(*) FROM medications')
-    if db.cursor.fetchone()[0] == 0:
-        sample_medications = [
-            ('Amoxicillin 500mg', 'Antibiotic capsules', 'Antibiotics', 100, 12.99),
-            ('Paracetamol 500mg', 'Pain reliever tablets', 'Analgesics', 200, 5.99),
-            ('Ibuprofen 400mg', 'Anti-inflammatory tablets', 'Analgesics', 150, 6.99),
-            ('Metformin 850mg', 'Anti-diabetic tablets', 'Diabetic', 80, 15.99),
-            ('Atorvastatin 20mg', 'Cholesterol lowering tablets', 'Cardiovascular', 120, 22.99),
-            ('Cetirizine 10mg', 'Antihistamine tablets', 'Allergy', 90, 9.99),
-            ('Omeprazole 20mg', 'Proton pump inhibitor', 'Gastrointestinal', 70, 14.99),
-            ('Amlodipine 5mg', 'Calcium channel blocker', 'Cardiovascular', 100, 18.99)
-        ]
-        
-        for med in sample_medications:
-            db.cursor.execute(
-                'INSERT INTO medications (name, description, category, stock, price) VALUES (?, ?, ?, ?, ?)',
-                med
-            )
+    # Only a brand new installation gets sample medications
+    if fresh_database:
+        seed_sample_data(cursor)
+
+def _migration_002_secondary_indexes(cursor: sqlite3.Cursor):
+    """
+    Create the secondary indexes listed in INDEXES
+    """
+    ensure_indexes(cursor)
+
+def _migration_003_medication_search(cursor: sqlite3.Cursor):
+    """
+    Create the medications_fts full-text index and the triggers keeping it in sync
+    
+    Skipped on SQLite builds without FTS5; search_medications then falls back
+    to LIKE matching.
+    """
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    if not cursor.fetchone()[0]:
+        return
+    
+    # External content table: the text lives in medications only. The prefix
+    # option adds 2 and 3 character prefix indexes for type-ahead queries.
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS medications_fts USING fts5(
+        name, description, category,
+        content='medications', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS medications_fts_insert AFTER INSERT ON medications BEGIN
+        INSERT INTO medications_fts (rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS medications_fts_delete AFTER DELETE ON medications BEGIN
+        INSERT INTO medications_fts (medications_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS medications_fts_update AFTER UPDATE OF name, description, category ON medications BEGIN
+        INSERT INTO medications_fts (medications_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO medications_fts (rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    ''')
+    
+    # Index the medications that already exist
+    cursor.execute("INSERT INTO medications_fts (medications_fts) VALUES ('rebuild')")
+
+# Stock at or below this level (but above zero) counts as low stock. The
+# inventory_counters triggers bake it in, so changing it needs a migration.
+LOW_STOCK_THRESHOLD = 10
+
+def _migration_004_inventory_counters(cursor: sqlite3.Cursor):
+    """
+    Create the single-row inventory_counters table and the triggers maintaining it
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS inventory_counters (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_medications INTEGER NOT NULL DEFAULT 0,
+        low_stock INTEGER NOT NULL DEFAULT 0,
+        out_of_stock INTEGER NOT NULL DEFAULT 0,
+        total_stock_value REAL NOT NULL DEFAULT 0
+    )
+    ''')
+    
+    low = f"(IFNULL({{row}}.stock, 0) > 0 AND IFNULL({{row}}.stock, 0) <= {LOW_STOCK_THRESHOLD})"
+    out = "(IFNULL({row}.stock, 0) <= 0)"
+    value = "(IFNULL({row}.stock, 0) * IFNULL({row}.price, 0))"
+    
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS inventory_counters_insert AFTER INSERT ON medications BEGIN
+        UPDATE inventory_counters SET
+            total_medications = total_medications + 1,
+            low_stock = low_stock + {low.format(row='new')},
+            out_of_stock = out_of_stock + {out.format(row='new')},
+            total_stock_value = total_stock_value + {value.format(row='new')}
+        WHERE id = 1;
+    END
+    ''')
     
-    # Commit changes
-    db.commit()
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS inventory_counters_delete AFTER DELETE ON medications BEGIN
+        UPDATE inventory_counters SET
+            total_medications = total_medications - 1,
+            low_stock = low_stock - {low.format(row='old')},
+            out_of_stock = out_of_stock - {out.format(row='old')},
+            total_stock_value = total_stock_value - {value.format(row='old')}
+        WHERE id = 1;
+    END
+    ''')
+    
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS inventory_counters_update AFTER UPDATE OF stock, price ON medications BEGIN
+        UPDATE inventory_counters SET
+            low_stock = low_stock - {low.format(row='old')} + {low.format(row='new')},
+            out_of_stock = out_of_stock - {out.format(row='old')} + {out.format(row='new')},
+            total_stock_value = total_stock_value - {value.format(row='old')} + {value.format(row='new')}
+        WHERE id = 1;
+    END
+    ''')
+    
+    refresh_inventory_counters(cursor)
+
+def _migration_005_stock_movement_rollups(cursor: sqlite3.Cursor):
+    """
+    Create the stock_movement_daily rollup table and its bookkeeping
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_movement_daily (
+        day TEXT NOT NULL,
+        medication_id INTEGER NOT NULL,
+        qty_in INTEGER NOT NULL DEFAULT 0,
+        qty_out INTEGER NOT NULL DEFAULT 0,
+        net INTEGER NOT NULL DEFAULT 0,
+        events INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, medication_id)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_stock_movement_daily_medication
+    ON stock_movement_daily (medication_id, day)
+    ''')
+    
+    # Last stock_history id folded into each rollup table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        name TEXT PRIMARY KEY,
+        last_history_id INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO rollup_state (name, last_history_id) VALUES ('stock_movement_daily', 0)")
+
+# change_log keeps about this many of its newest entries
+CHANGE_LOG_RETENTION = 10000
+
+def _migration_006_change_log(cursor: sqlite3.Cursor):
+    """
+    Create the change_log table recording which medications and users changed
+    """
+    # AUTOINCREMENT so a pruned seq is never reused by a later change
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL
+    )
+    ''')
+    
+    for table in ('medications', 'users'):
+        for event, row in (('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')):
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS change_log_{table}_{event.lower()} AFTER {event} ON {table} BEGIN
+                INSERT INTO change_log (table_name, row_id) VALUES ('{table}', {row}.id);
+            END
+            ''')
+    
+    # Prune in steps of a thousand entries so most writes skip the delete
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS change_log_prune AFTER INSERT ON change_log
+    WHEN new.seq % 1000 = 0 BEGIN
+        DELETE FROM change_log WHERE seq <= new.seq - {CHANGE_LOG_RETENTION};
+    END
+    ''')
+
+# Ordered schema migrations: (version, migration). Each migration runs once,
+# in its own transaction, and PRAGMA user_version records the last one applied.
+# Never edit or reorder a released migration; append a new one instead.
+MIGRATIONS = (
+    (1, _migration_001_base_schema),
+    (2, _migration_002_secondary_indexes),
+    (3, _migration_003_medication_search),
+    (4, _migration_004_inventory_counters),
+    (5, _migration_005_stock_movement_rollups),
+    (6, _migration_006_change_log),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version() -> int:
+    """
+    Get the schema version recorded in the database
+    """
+    db = Database()
+    return db.connect().execute('PRAGMA user_version').fetchone()[0]
+
+def migrate() -> List[int]:
+    """
+    Apply every pending migration in order
+    
+    Returns:
+        List[int]: Versions of the migrations that were applied
+    """
+    db = Database()
+    applied = []
+    
+    for version, migration in MIGRATIONS:
+        # BEGIN IMMEDIATE takes the write lock before re-reading the version,
+        # so two terminals starting at once cannot both apply a migration
+        with db.transaction(immediate=True) as cursor:
+            cursor.execute('PRAGMA user_version')
+            if cursor.fetchone()[0] >= version:
+                continue
+            
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+        applied.append(version)
+    
+    if applied:
+        MedicationCatalog().invalidate()
+    return applied
+
+def init_database():
+    """
+    Initialize the database and bring its schema up to date.
+    
+    When the schema is already current this only reads PRAGMA user_version,
+    so a normal launch runs no DDL and no seeding queries.
+    """
+    if get_schema_version() >= SCHEMA_VERSION:
+        return
+    
+    migrate()
 
 def hash_password(password: str) -> str:
     """
@@ -157,10 +923,10 @@ def authenticate_user(username: str, password: str) -> Optional[Dict]:
         Dict: User data if authentication is successful, None otherwise
     """
     db = Database()
-    db.connect()
     
-    db.cursor.execute('SELECT * FROM users WHERE username = ? AND active = 1', (username,))
-    user = db.cursor.fetchone()
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT * FROM users WHERE username = ? AND active = 1', (username,))
+        user = cursor.fetchone()
     
     if user and verify_password(user['password'], password):
         # Convert user row to dictionary
@@ -171,26 +937,15 @@ def authenticate_user(username: str, password: str) -> Optional[Dict]:
     
     return None
 
-def filter_medicines(self, text):
-    for row in range(self.table_inventory.rowCount()):
-        match = False
-        for col in range(self.table_inventory.columnCount()):
-            item = self.table_inventory.item(row, col)
-            if item and text.lower() in item.text().lower():
-                match = True
-                break
-        self.table_inventory.setRowHidden(row, not match)
-
-
 def username_exists(username: str) -> bool:
     """
     Check if a username already exists in the database
     """
     db = Database()
-    db.connect()
     
-    db.cursor.execute('SELECT COUNT(*) FROM users WHERE username = ?', (username,))
-    count = db.cursor.fetchone()[0]
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM users WHERE username = ?', (username,))
+        count = cursor.fetchone()[0]
     
     return count > 0
 
@@ -202,18 +957,17 @@ def register_user(username: str, password: str, fullname: str, email: str, phone
         bool: True if registration is successful, False otherwise
     """
     db = Database()
-    db.connect()
     
     try:
         # Hash the password
         password_hash = hash_password(password)
         
         # Insert the new user
-        db.cursor.execute(
-            'INSERT INTO users (username, password, fullname, email, phone, role) VALUES (?, ?, ?, ?, ?, ?)',
-            (username, password_hash, fullname, email, phone, role)
-        )
-        db.commit()
+        with db.transaction() as cursor:
+            cursor.execute(
+                'INSERT INTO users (username, password, fullname, email, phone, role) VALUES (?, ?, ?, ?, ?, ?)',
+                (username, password_hash, fullname, email, phone, role)
+            )
         return True
     except sqlite3.Error:
         return False
@@ -226,10 +980,33 @@ def get_all_users() -> List[Dict]:
         List[Dict]: List of user dictionaries
     """
     db = Database()
-    db.connect()
     
-    db.cursor.execute('SELECT id, username, fullname, email, phone, role, active FROM users')
-    users = [dict(row) for row in db.cursor.fetchall()]
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT id, username, fullname, email, phone, role, active FROM users')
+        users = [dict(row) for row in cursor.fetchall()]
+    
+    return users
+
+def get_users_by_ids(user_ids: Iterable[int]) -> List[Dict]:
+    """
+    Get the users with the given IDs; IDs that no longer exist are left out
+    
+    Returns:
+        List[Dict]: User dictionaries with the same fields as get_all_users
+    """
+    db = Database()
+    user_ids = list(user_ids)
+    users = []
+    
+    with db.get_cursor() as cursor:
+        for start in range(0, len(user_ids), MAX_SQL_VARIABLES):
+            chunk = user_ids[start:start + MAX_SQL_VARIABLES]
+            cursor.execute(
+                f"SELECT id, username, fullname, email, phone, role, active FROM users "
+                f"WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            users.extend(dict(row) for row in cursor.fetchall())
     
     return users
 
@@ -241,10 +1018,380 @@ def get_all_medications() -> List[Dict]:
         List[Dict]: List of medication dictionaries
     """
     db = Database()
-    db.connect()
     
-    db.cursor.execute('SELECT * FROM medications')
-    medications = [dict(row) for row in db.cursor.fetchall()]
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT * FROM medications')
+        medications = [dict(row) for row in cursor.fetchall()]
+    
+    return medications
+
+def refresh_inventory_counters(cursor: Optional[sqlite3.Cursor] = None):
+    """
+    Recompute inventory_counters from the medications table
+    
+    The triggers keep the counters current; this is for backfilling them and
+    for repairing rounding drift in total_stock_value.
+    
+    Args:
+        cursor (sqlite3.Cursor, optional): Cursor of an open transaction to use
+    """
+    if cursor is None:
+        with Database().transaction() as cursor:
+            return refresh_inventory_counters(cursor)
+    
+    cursor.execute('''
+    INSERT OR REPLACE INTO inventory_counters
+        (id, total_medications, low_stock, out_of_stock, total_stock_value)
+    SELECT 1,
+           COUNT(*),
+           IFNULL(SUM(IFNULL(stock, 0) > 0 AND IFNULL(stock, 0) <= ?), 0),
+           IFNULL(SUM(IFNULL(stock, 0) <= 0), 0),
+           IFNULL(SUM(IFNULL(stock, 0) * IFNULL(price, 0)), 0)
+    FROM medications
+    ''', (LOW_STOCK_THRESHOLD,))
+
+def get_inventory_counters() -> Dict:
+    """
+    Get the dashboard inventory counters with a single-row read
+    
+    Returns:
+        Dict: total_medications, low_stock, out_of_stock and total_stock_value
+    """
+    db = Database()
+    
+    with db.get_cursor() as cursor:
+        cursor.execute('''SELECT total_medications, low_stock, out_of_stock, total_stock_value
+                          FROM inventory_counters WHERE id = 1''')
+        row = cursor.fetchone()
+    
+    if not row:
+        return {'total_medications': 0, 'low_stock': 0, 'out_of_stock': 0, 'total_stock_value': 0.0}
+    
+    counters = dict(row)
+    counters['total_stock_value'] = round(counters['total_stock_value'], 2)
+    return counters
+
+def get_user_counts() -> Dict:
+    """
+    Get the number of users and of active pharmacists
+    
+    Returns:
+        Dict: total_users and active_pharmacists
+    """
+    db = Database()
+    
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM users')
+        total_users = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM users WHERE role = ? AND active = 1', ('pharmacist',))
+        active_pharmacists = cursor.fetchone()[0]
+    
+    return {'total_users': total_users, 'active_pharmacists': active_pharmacists}
+
+def get_data_version() -> int:
+    """
+    Get PRAGMA data_version for this thread's connection
+    
+    The value changes whenever another connection commits, so comparing it
+    between calls made on the same thread-bound connection detects outside
+    writes without reading any table. Values from different connections are
+    not comparable.
+    """
+    db = Database()
+    return db.connect().execute('PRAGMA data_version').fetchone()[0]
+
+def get_change_sequence() -> int:
+    """
+    Get the seq of the newest change_log entry, 0 if there is none
+    """
+    db = Database()
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT MAX(seq) FROM change_log')
+        return cursor.fetchone()[0] or 0
+
+def get_changes_since(seq: int, limit: int = 1000) -> Dict:
+    """
+    Get the medications and users changed after a change_log seq
+    
+    Args:
+        seq (int): seq returned by the previous call, or by get_change_sequence
+        limit (int): Most change_log entries to read
+    
+    Returns:
+        Dict: seq to pass to the next call, the changed medication_ids and
+            user_ids, and complete, which is False when entries after seq
+            were pruned or more than limit changes were made; the ids are then
+            partial and callers should reload everything instead
+    """
+    db = Database()
+    
+    with db.get_cursor() as cursor:
+        cursor.execute(
+            'SELECT seq, table_name, row_id FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?',
+            (seq, limit + 1)
+        )
+        rows = cursor.fetchall()
+        cursor.execute('SELECT MIN(seq), MAX(seq) FROM change_log')
+        oldest, newest = cursor.fetchone()
+    
+    changes = {'seq': seq, 'medication_ids': [], 'user_ids': [], 'complete': True}
+    if not rows:
+        return changes
+    
+    # Entries between seq and the oldest one kept were pruned
+    changes['complete'] = len(rows) <= limit and oldest is not None and oldest <= seq + 1
+    if not changes['complete']:
+        # The caller reloads everything, which covers every change so far
+        changes['seq'] = max(newest or 0, rows[-1]['seq'])
+        return changes
+    changes['seq'] = rows[-1]['seq']
+    
+    medication_ids, user_ids = {}, {}
+    for row in rows:
+        ids = medication_ids if row['table_name'] == 'medications' else user_ids
+        ids[row['row_id']] = None
+    changes['medication_ids'] = list(medication_ids)
+    changes['user_ids'] = list(user_ids)
+    return changes
+
+# Columns of the medications table that can be projected, filtered and sorted on
+MEDICATION_COLUMNS = ('id', 'name', 'description', 'category', 'stock', 'price', 'created_at', 'updated_at')
+
+# Filter operators accepted as "<column>__<operator>" keys by the paged queries
+_FILTER_OPERATORS = {
+    'gt': '>',
+    'gte': '>=',
+    'lt': '<',
+    'lte': '<=',
+}
+
+def _check_medication_column(column: str):
+    """
+    Reject anything that is not a medications column before it reaches SQL
+    """
+    if column not in MEDICATION_COLUMNS:
+        raise ValueError(f"Unknown medication column: {column}")
+
+def _build_medication_filters(filters: Optional[Dict]) -> Tuple[List[str], List]:
+    """
+    Translate a filters dict into WHERE clauses and parameters
+    
+    Plain column keys match by equality (None matches NULL). Keys of the form
+    column__gt/gte/lt/lte compare, column__in matches a list of values and
+    column__prefix/column__contains do a case-insensitive LIKE. The special
+    key 'search' keeps the rows search_medications would match for its text.
+    """
+    clauses, params = [], []
+    for key, value in (filters or {}).items():
+        if key == 'search':
+            terms = _search_terms(value)
+            if terms:
+                clause, clause_params = _search_clause(terms)
+                clauses.append(clause)
+                params.extend(clause_params)
+            continue
+        
+        column, _, operator = key.partition('__')
+        _check_medication_column(column)
+        
+        if not operator:
+            if value is None:
+                clauses.append(f"{column} IS NULL")
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        elif operator in _FILTER_OPERATORS:
+            clauses.append(f"{column} {_FILTER_OPERATORS[operator]} ?")
+            params.append(value)
+        elif operator == 'in':
+            values = list(value)
+            if not values:
+                clauses.append("0")
+            else:
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        elif operator in ('prefix', 'contains'):
+            escaped = str(value).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = f"{escaped}%" if operator == 'prefix' else f"%{escaped}%"
+            clauses.append(f"{column} LIKE ? ESCAPE '\\'")
+            params.append(pattern)
+        else:
+            raise ValueError(f"Unknown filter operator: {operator}")
+    return clauses, params
+
+def get_medications_page(columns: Optional[List[str]] = None, filters: Optional[Dict] = None,
+                         order_by: str = 'id', descending: bool = False,
+                         after: Optional[Tuple] = None, limit: int = 500) -> Tuple[List[Dict], Optional[Tuple]]:
+    """
+    Get one page of medications using keyset pagination
+    
+    Pages are addressed by the (sort value, id) of the last row of the previous
+    page rather than an OFFSET, so every page costs the same however deep
+    into the table it is.
+    
+    Args:
+        columns (List[str], optional): Columns to return, all columns if omitted
+        filters (Dict, optional): Filters, see _build_medication_filters
+        order_by (str): Column to sort on; id breaks ties
+        descending (bool): Sort in descending order
+        after (Tuple, optional): Cursor returned with the previous page
+        limit (int): Maximum number of rows in the page
+    
+    Returns:
+        Tuple: (rows, cursor) where cursor is passed as 'after' to get the
+            next page, or None when this is the last page
+    
+    Raises:
+        ValueError: If a column is unknown or limit is not positive
+    """
+    if limit <= 0:
+        raise ValueError(f"Page limit must be positive, got {limit}")
+    _check_medication_column(order_by)
+    columns = list(columns or MEDICATION_COLUMNS)
+    for column in columns:
+        _check_medication_column(column)
+    
+    # The sort column and id are always selected so the cursor can be built
+    selected = columns + [column for column in ('id', order_by) if column not in columns]
+    clauses, params = _build_medication_filters(filters)
+    
+    if after is not None:
+        last_value, last_id = after
+        if order_by == 'id':
+            clauses.append("id < ?" if descending else "id > ?")
+            params.append(last_id)
+        elif not descending:
+            # NULLs sort first in ascending order
+            if last_value is None:
+                clauses.append(f"(({order_by} IS NULL AND id > ?) OR {order_by} IS NOT NULL)")
+                params.append(last_id)
+            else:
+                clauses.append(f"({order_by} > ? OR ({order_by} = ? AND id > ?))")
+                params.extend([last_value, last_value, last_id])
+        else:
+            # NULLs sort last in descending order
+            if last_value is None:
+                clauses.append(f"({order_by} IS NULL AND id < ?)")
+                params.append(last_id)
+            else:
+                clauses.append(f"({order_by} < ? OR ({order_by} = ? AND id < ?) OR {order_by} IS NULL)")
+                params.extend([last_value, last_value, last_id])
+    
+    direction = 'DESC' if descending else 'ASC'
+    order = f"id {direction}" if order_by == 'id' else f"{order_by} {direction}, id {direction}"
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    query = f"SELECT {', '.join(selected)} FROM medications{where} ORDER BY {order} LIMIT ?"
+    params.append(limit)
+    
+    db = Database()
+    with db.get_cursor() as cursor:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    
+    cursor_value = None
+    if len(rows) == limit:
+        cursor_value = (rows[-1][order_by], rows[-1]['id'])
+    
+    return [{column: row[column] for column in columns} for row in rows], cursor_value
+
+def iter_medications(columns: Optional[List[str]] = None, filters: Optional[Dict] = None,
+                     order_by: str = 'id', descending: bool = False,
+                     page_size: int = 500) -> Iterator[Dict]:
+    """
+    Stream medications page by page without materializing the whole table
+    
+    Takes the same arguments as get_medications_page.
+    
+    Yields:
+        Dict: One medication per row
+    
+    Raises:
+        ValueError: If a column is unknown or page_size is not positive
+    """
+    after = None
+    while True:
+        rows, after = get_medications_page(columns, filters, order_by, descending, after, page_size)
+        yield from rows
+        if after is None:
+            return
+
+def _search_terms(text: str) -> List[str]:
+    """
+    Split search text into word terms, dropping FTS5 query syntax
+    """
+    return re.findall(r'\w+', text or '')
+
+def _has_fts() -> bool:
+    """
+    Check whether migration 3 created the full-text index
+    """
+    db = Database()
+    with db.get_cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'medications_fts'")
+        return cursor.fetchone() is not None
+
+def _fts_match(terms: List[str]) -> str:
+    """
+    Build an FTS5 query matching every term as a word prefix
+    """
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def _like_clause(terms: List[str]) -> Tuple[str, List]:
+    """
+    Match each term anywhere in the text columns, for SQLite builds without FTS5
+    """
+    clauses = ["(name LIKE ? OR description LIKE ? OR category LIKE ?)"] * len(terms)
+    return ' AND '.join(clauses), [f"%{term}%" for term in terms for _ in range(3)]
+
+def _search_clause(terms: List[str]) -> Tuple[str, List]:
+    """
+    WHERE clause restricting medications to those matching the search terms
+    """
+    if _has_fts():
+        return "id IN (SELECT rowid FROM medications_fts WHERE medications_fts MATCH ?)", [_fts_match(terms)]
+    clause, params = _like_clause(terms)
+    return f"({clause})", params
+
+def search_medications(text: str, limit: Optional[int] = 50, in_stock: bool = False) -> List[Dict]:
+    """
+    Full-text search over medication name, description and category
+    
+    Every word in the text must match the start of a word in one of those
+    columns, so "amox 500" finds "Amoxicillin 500mg". Results are ranked with
+    bm25, weighting name matches above category and description matches.
+    
+    Args:
+        text (str): Text typed by the user
+        limit (int, optional): Maximum number of results, None for no limit
+        in_stock (bool): Only return medications with stock left
+    
+    Returns:
+        List[Dict]: Matching medications, best match first
+    """
+    terms = _search_terms(text)
+    if not terms:
+        return []
+    
+    fts = _has_fts()
+    stock_clause = " AND stock > 0" if in_stock else ""
+    db = Database()
+    with db.get_cursor() as cursor:
+        if fts:
+            cursor.execute(
+                f'''SELECT m.* FROM medications_fts
+                   JOIN medications m ON m.id = medications_fts.rowid
+                   WHERE medications_fts MATCH ?{stock_clause}
+                   ORDER BY bm25(medications_fts, 10.0, 1.0, 3.0)
+                   LIMIT ?''',
+                (_fts_match(terms), -1 if limit is None else limit)
+            )
+        else:
+            clause, params = _like_clause(terms)
+            cursor.execute(
+                f"SELECT * FROM medications WHERE {clause}{stock_clause} ORDER BY name LIMIT ?",
+                params + [-1 if limit is None else limit]
+            )
+        medications = [dict(row) for row in cursor.fetchall()]
     
     return medications
 
@@ -258,35 +1405,36 @@ def get_medication_by_id(medication_id: int) -> Optional[Dict]:
     Returns:
         Dict: Medication data if found, None otherwise
     """
-    db = Database()
-    db.connect()
-    
-    db.cursor.execute('SELECT * FROM medications WHERE id = ?', (medication_id,))
-    medication = db.cursor.fetchone()
+    medication = MedicationCatalog().get(medication_id)
     
     return dict(medication) if medication else None
 
-def add_medication(name: str, description: str, category: str, stock: int, price: float) -> bool:
+def add_medication(name: str, description: str, category: str, stock: int, price: float) -> Optional[int]:
     """
     Add a new medication to the database
     
     Returns:
-        bool: True if operation is successful, False otherwise
+        int: ID of the new medication, or None if the insert failed
     """
     db = Database()
-    db.connect()
     
     try:
         now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        db.cursor.execute(
-            'INSERT INTO medications (name, description, category, stock, price, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
-            (name, description, category, stock, price, now, now)
-        )
-        db.commit()
-        return True
+        with db.transaction() as cursor:
+            cursor.execute(
+                'INSERT INTO medications (name, description, category, stock, price, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (name, description, category, stock, price, now, now)
+            )
+            medication_id = cursor.lastrowid
+            cursor.execute('SELECT * FROM medications WHERE id = ?', (medication_id,))
+            medication = dict(cursor.fetchone())
+            seq = _change_log_seq(cursor)
+        
+        MedicationCatalog().put(medication, seq)
+        return medication_id
     except sqlite3.Error:
-        return False
+        return None
 
 def update_medication_stock(medication_id: int, new_stock: int, reason: str, user_id: int = None) -> bool:
     """
@@ -302,36 +1450,205 @@ def update_medication_stock(medication_id: int, new_stock: int, reason: str, use
         bool: True if operation is successful, False otherwise
     """
     db = Database()
-    db.connect()
     
     try:
-        # Get current stock
-        db.cursor.execute('SELECT stock FROM medications WHERE id = ?', (medication_id,))
-        result = db.cursor.fetchone()
-        
-        if not result:
-            return False
+        with db.transaction(immediate=True) as cursor:
+            # Get current stock
+            cursor.execute('SELECT stock FROM medications WHERE id = ?', (medication_id,))
+            result = cursor.fetchone()
             
-        previous_stock = result['stock']
-        
-        # Update medication stock
-        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        db.cursor.execute(
-            'UPDATE medications SET stock = ?, updated_at = ? WHERE id = ?',
-            (new_stock, now, medication_id)
-        )
-        
-        # Record in stock_history
-        db.cursor.execute(
-            'INSERT INTO stock_history (medication_id, previous_stock, new_stock, changed_by, reason) VALUES (?, ?, ?, ?, ?)',
-            (medication_id, previous_stock, new_stock, user_id, reason)
-        )
+            if not result:
+                return False
+                
+            previous_stock = result['stock']
+            
+            # Update medication stock
+            now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            cursor.execute(
+                'UPDATE medications SET stock = ?, updated_at = ? WHERE id = ?',
+                (new_stock, now, medication_id)
+            )
+            
+            # Record in stock_history
+            cursor.execute(
+                'INSERT INTO stock_history (medication_id, previous_stock, new_stock, changed_by, reason) VALUES (?, ?, ?, ?, ?)',
+                (medication_id, previous_stock, new_stock, user_id, reason)
+            )
         
-        db.commit()
+        MedicationCatalog().remove(medication_id)
         return True
     except sqlite3.Error:
         return False
 
+# Upper bound on "?" placeholders per statement (SQLITE_MAX_VARIABLE_NUMBER
+# is 999 on older SQLite builds)
+MAX_SQL_VARIABLES = 900
+
+def update_medication_stock_batch(entries: Iterable[Dict], user_id: int = None) -> List[Dict]:
+    """
+    Apply many stock changes in a single transaction
+    
+    Each entry is a dict with 'medication_id', a 'reason' and either a 'delta'
+    (added to the current stock, negative to remove) or an absolute
+    'new_stock'. Entries are applied in order, so several entries for the same
+    medication accumulate. Invalid entries are skipped and reported; the valid
+    ones are written with one UPDATE and one stock_history executemany.
+    
+    Args:
+        entries (Iterable[Dict]): Stock changes to apply
+        user_id (int, optional): ID of the user making the changes
+    
+    Returns:
+        List[Dict]: One result per entry with 'medication_id', 'success',
+            'previous_stock', 'new_stock' and 'error'
+    """
+    db = Database()
+    entries = list(entries)
+    results = [{'medication_id': entry.get('medication_id'), 'success': False,
+                'previous_stock': None, 'new_stock': None, 'error': None}
+               for entry in entries]
+    
+    medication_ids = list({entry.get('medication_id') for entry in entries
+                           if entry.get('medication_id') is not None})
+    
+    try:
+        # The deltas apply to the stock read here, so no other connection may
+        # commit between this read and the write
+        with db.transaction(immediate=True) as cursor:
+            # Get current stock of every medication in the batch
+            current = {}
+            for start in range(0, len(medication_ids), MAX_SQL_VARIABLES):
+                chunk = medication_ids[start:start + MAX_SQL_VARIABLES]
+                cursor.execute(
+                    f"SELECT id, stock FROM medications WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                )
+                current.update((row['id'], row['stock']) for row in cursor.fetchall())
+            
+            now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            changed = {}
+            history = []
+            for entry, result in zip(entries, results):
+                medication_id = entry.get('medication_id')
+                if medication_id not in current:
+                    result['error'] = "Medication not found."
+                    continue
+                
+                previous_stock = current[medication_id]
+                try:
+                    if entry.get('new_stock') is not None:
+                        new_stock = int(entry['new_stock'])
+                    else:
+                        new_stock = previous_stock + int(entry['delta'])
+                except (KeyError, TypeError, ValueError):
+                    result['error'] = "Entry needs a whole number 'delta' or 'new_stock'."
+                    continue
+                
+                if new_stock < 0:
+                    result['error'] = f"Not enough stock. Only {previous_stock} available."
+                    continue
+                
+                current[medication_id] = new_stock
+                changed[medication_id] = new_stock
+                history.append((medication_id, previous_stock, new_stock, user_id, entry.get('reason')))
+                result.update(success=True, previous_stock=previous_stock, new_stock=new_stock)
+            
+            # Update medication stock
+            cursor.executemany(
+                'UPDATE medications SET stock = ?, updated_at = ? WHERE id = ?',
+                [(stock, now, medication_id) for medication_id, stock in changed.items()]
+            )
+            
+            # Record in stock_history
+            cursor.executemany(
+                'INSERT INTO stock_history (medication_id, previous_stock, new_stock, changed_by, reason) VALUES (?, ?, ?, ?, ?)',
+                history
+            )
+        
+        catalog = MedicationCatalog()
+        for medication_id in changed:
+            catalog.remove(medication_id)
+    except sqlite3.Error as e:
+        for result in results:
+            result.update(success=False, previous_stock=None, new_stock=None, error=str(e))
+    
+    return results
+
+# UPDATE ... RETURNING needs SQLite 3.35 or newer
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+def dispense_stock(medication_id: int, quantity: int, reason: str, user_id: int = None) -> Dict:
+    """
+    Atomically take stock out for dispensing and record it in stock_history
+    
+    The decrement is a single guarded UPDATE (stock >= quantity), so two
+    terminals dispensing the same medication can never oversell it. The
+    current stock is only read back when the guard rejects the update, to
+    report the shortfall.
+    
+    Args:
+        medication_id (int): ID of the medication to dispense
+        quantity (int): Number of units to dispense
+        reason (str): Reason recorded in stock_history
+        user_id (int, optional): ID of the user dispensing
+    
+    Returns:
+        Dict: 'success', 'medication_id', 'name', 'previous_stock',
+            'new_stock', 'available' (stock on hand when dispensing failed
+            for lack of stock) and 'error'
+    """
+    db = Database()
+    result = {'success': False, 'medication_id': medication_id, 'name': None,
+              'previous_stock': None, 'new_stock': None, 'available': None, 'error': None}
+    
+    if quantity <= 0:
+        result['error'] = "Quantity must be a positive number."
+        return result
+    
+    try:
+        with db.transaction() as cursor:
+            now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            update = 'UPDATE medications SET stock = stock - ?, updated_at = ? WHERE id = ? AND stock >= ?'
+            params = (quantity, now, medication_id, quantity)
+            
+            if _SUPPORTS_RETURNING:
+                cursor.execute(update + ' RETURNING stock, name', params)
+                row = cursor.fetchone()
+            else:
+                cursor.execute(update, params)
+                row = None
+                if cursor.rowcount == 1:
+                    cursor.execute('SELECT stock, name FROM medications WHERE id = ?', (medication_id,))
+                    row = cursor.fetchone()
+            
+            if row is None:
+                # Guard rejected the update: find out whether stock or the medication is missing
+                cursor.execute('SELECT stock, name FROM medications WHERE id = ?', (medication_id,))
+                current = cursor.fetchone()
+                if current is None:
+                    result['error'] = "Medication not found."
+                else:
+                    result['name'] = current['name']
+                    result['available'] = current['stock']
+                    result['error'] = f"Not enough stock. Only {current['stock']} available."
+                return result
+            
+            new_stock = row['stock']
+            previous_stock = new_stock + quantity
+            
+            # Record in stock_history
+            cursor.execute(
+                'INSERT INTO stock_history (medication_id, previous_stock, new_stock, changed_by, reason) VALUES (?, ?, ?, ?, ?)',
+                (medication_id, previous_stock, new_stock, user_id, reason)
+            )
+        
+        MedicationCatalog().remove(medication_id)
+        result.update(success=True, name=row['name'], previous_stock=previous_stock, new_stock=new_stock)
+    except sqlite3.Error as e:
+        result['error'] = str(e)
+    
+    return result
+
 def delete_medication(medication_id: int) -> bool:
     """
     Delete a medication from the database
@@ -343,16 +1660,326 @@ def delete_medication(medication_id: int) -> bool:
         bool: True if operation is successful, False otherwise
     """
     db = Database()
-    db.connect()
     
     try:
-        # Delete medication
-        db.cursor.execute('DELETE FROM medications WHERE id = ?', (medication_id,))
-        
-        # Delete related stock history
-        db.cursor.execute('DELETE FROM stock_history WHERE medication_id = ?', (medication_id,))
+        with db.transaction() as cursor:
+            # Delete medication
+            cursor.execute('DELETE FROM medications WHERE id = ?', (medication_id,))
+            
+            # Delete related stock history and its rollups
+            cursor.execute('DELETE FROM stock_history WHERE medication_id = ?', (medication_id,))
+            cursor.execute('DELETE FROM stock_movement_daily WHERE medication_id = ?', (medication_id,))
         
-        db.commit()
+        MedicationCatalog().remove(medication_id)
         return True
     except sqlite3.Error:
-        return False
\ No newline at end of file
+        return False
+
+# Columns accepted by the bulk medication import
+MEDICATION_IMPORT_FIELDS = ('name', 'description', 'category', 'stock', 'price')
+
+# Maximum number of rejected rows kept in an import report
+MAX_REPORTED_IMPORT_ERRORS = 100
+
+def iter_medication_rows(path: str, fmt: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Stream medication records from a CSV, JSON Lines or JSON file
+    
+    CSV files need a header row naming the MEDICATION_IMPORT_FIELDS columns.
+    CSV and JSON Lines (.jsonl/.ndjson) are read one record at a time; a plain
+    JSON file must hold an array of objects and is parsed in one go.
+    
+    Args:
+        path (str): Path of the file to read
+        fmt (str, optional): 'csv', 'jsonl' or 'json'; guessed from the extension if omitted
+    
+    Yields:
+        Dict: One raw record per medication
+    """
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'json'}.get(ext)
+        if fmt is None:
+            raise ValueError(f"Cannot guess the import format of {path}")
+    
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    elif fmt == 'jsonl':
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'json':
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            raise ValueError("A JSON import file must contain an array of medications")
+        yield from records
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+def validate_medication_row(row: Dict) -> Tuple[str, str, str, int, float]:
+    """
+    Validate and normalise one imported medication record
+    
+    Returns:
+        Tuple: (name, description, category, stock, price) ready for insertion
+    
+    Raises:
+        ValueError: If the record is not a valid medication
+    """
+    if not isinstance(row, dict):
+        raise ValueError("record is not an object")
+    
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError("name is required")
+    
+    description = str(row.get('description') or '').strip()
+    category = str(row.get('category') or '').strip() or 'Other'
+    
+    stock = row.get('stock')
+    # int() would truncate 12.7 and accept True
+    if isinstance(stock, bool) or (isinstance(stock, float) and not stock.is_integer()):
+        raise ValueError(f"stock must be a whole number, got {stock!r}")
+    try:
+        stock = int(stock) if stock not in (None, '') else 0
+    except (TypeError, ValueError):
+        raise ValueError(f"stock must be a whole number, got {stock!r}")
+    if stock < 0:
+        raise ValueError("stock cannot be negative")
+    
+    price = row.get('price')
+    try:
+        price = float(price) if price not in (None, '') else 0.0
+    except (TypeError, ValueError):
+        raise ValueError(f"price must be a number, got {price!r}")
+    if price < 0:
+        raise ValueError("price cannot be negative")
+    
+    return name, description, category, stock, price
+
+def import_medications(rows: Iterable[Dict], chunk_size: int = 1000,
+                       progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Bulk insert medications with executemany in chunked transactions
+    
+    Rows are validated as they stream in; invalid rows are skipped and
+    reported. Each chunk of valid rows is inserted in its own transaction,
+    so a failing chunk does not undo earlier ones.
+    
+    Args:
+        rows (Iterable[Dict]): Medication records, e.g. from iter_medication_rows
+        chunk_size (int): Number of rows inserted per transaction
+        progress (Callable, optional): Called with the running report after each chunk
+    
+    Returns:
+        Dict: Import report with read, inserted and rejected counts, the first
+            rejected rows as (row_number, message) pairs, elapsed seconds and
+            rows_per_second throughput
+    """
+    db = Database()
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    report = {'read': 0, 'inserted': 0, 'rejected': 0, 'errors': [],
+              'elapsed': 0.0, 'rows_per_second': 0.0}
+    started = time.perf_counter()
+    
+    def reject(row_number, message):
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_REPORTED_IMPORT_ERRORS:
+            report['errors'].append((row_number, message))
+    
+    def update_throughput():
+        report['elapsed'] = time.perf_counter() - started
+        if report['elapsed'] > 0:
+            report['rows_per_second'] = report['inserted'] / report['elapsed']
+    
+    def flush(chunk, first_row_number):
+        try:
+            with db.transaction() as cursor:
+                cursor.executemany(
+                    'INSERT INTO medications (name, description, category, stock, price, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    chunk
+                )
+            report['inserted'] += len(chunk)
+            MedicationCatalog().invalidate()
+        except sqlite3.Error as e:
+            report['rejected'] += len(chunk)
+            if len(report['errors']) < MAX_REPORTED_IMPORT_ERRORS:
+                report['errors'].append((first_row_number, f"chunk of {len(chunk)} rows failed: {e}"))
+        
+        update_throughput()
+        if progress:
+            progress(report)
+    
+    chunk = []
+    chunk_start = 1
+    for row_number, row in enumerate(rows, start=1):
+        report['read'] += 1
+        try:
+            chunk.append(validate_medication_row(row) + (now, now))
+        except ValueError as e:
+            reject(row_number, str(e))
+            continue
+        
+        if len(chunk) >= chunk_size:
+            flush(chunk, chunk_start)
+            chunk = []
+            chunk_start = row_number + 1
+    
+    if chunk:
+        flush(chunk, chunk_start)
+    
+    update_throughput()
+    return report
+
+
+def get_recent_activity(after_id: Optional[int] = None, limit: int = 20) -> List[Dict]:
+    """
+    Get the newest stock_history events with their medication and user
+    
+    The history is walked backwards along its INTEGER PRIMARY KEY and the
+    names are looked up by primary key, so the cost depends on limit, not on
+    how long the history is. Passing the largest id already shown as
+    after_id only reads the events added since.
+    
+    Args:
+        after_id (int, optional): Only return events with a larger id
+        limit (int): Maximum number of events
+    
+    Returns:
+        List[Dict]: Events, newest first, with id, timestamp, medication_id,
+            medication_name, user_fullname, user_role, previous_stock,
+            new_stock and reason; names are None when the row is gone
+    """
+    db = Database()
+    
+    with db.get_cursor() as cursor:
+        cursor.execute(
+            '''SELECT h.id, h.timestamp, h.medication_id, m.name AS medication_name,
+                      u.fullname AS user_fullname, u.role AS user_role,
+                      h.previous_stock, h.new_stock, h.reason
+               FROM stock_history h
+               LEFT JOIN medications m ON m.id = h.medication_id
+               LEFT JOIN users u ON u.id = h.changed_by
+               WHERE h.id > ?
+               ORDER BY h.id DESC
+               LIMIT ?''',
+            (after_id or 0, limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+# Per-row movement of a stock_history entry, shared by the rollup job and the
+# report's scan of rows not rolled up yet
+_MOVEMENT_COLUMNS = '''
+    date(timestamp) AS day,
+    medication_id,
+    SUM(MAX(IFNULL(new_stock, 0) - IFNULL(previous_stock, 0), 0)) AS qty_in,
+    SUM(MAX(IFNULL(previous_stock, 0) - IFNULL(new_stock, 0), 0)) AS qty_out,
+    SUM(IFNULL(new_stock, 0) - IFNULL(previous_stock, 0)) AS net,
+    COUNT(*) AS events
+'''
+
+def rollup_stock_history() -> int:
+    """
+    Fold stock_history rows added since the last run into stock_movement_daily
+    
+    The job is incremental: rollup_state remembers the last history id rolled
+    up, so each run only aggregates the new rows. Days are UTC dates, like
+    the stock_history timestamps.
+    
+    Returns:
+        int: Number of stock_history rows rolled up
+    """
+    db = Database()
+    
+    with db.transaction(immediate=True) as cursor:
+        cursor.execute("SELECT last_history_id FROM rollup_state WHERE name = 'stock_movement_daily'")
+        last_id = cursor.fetchone()[0]
+        cursor.execute('SELECT MAX(id) FROM stock_history')
+        max_id = cursor.fetchone()[0]
+        
+        if max_id is None or max_id <= last_id:
+            return 0
+        
+        cursor.execute(f'''
+        INSERT INTO stock_movement_daily (day, medication_id, qty_in, qty_out, net, events)
+        SELECT {_MOVEMENT_COLUMNS}
+        FROM stock_history
+        WHERE id > ? AND id <= ? AND medication_id IS NOT NULL
+        GROUP BY day, medication_id
+        ON CONFLICT (day, medication_id) DO UPDATE SET
+            qty_in = qty_in + excluded.qty_in,
+            qty_out = qty_out + excluded.qty_out,
+            net = net + excluded.net,
+            events = events + excluded.events
+        ''', (last_id, max_id))
+        
+        cursor.execute('SELECT COUNT(*) FROM stock_history WHERE id > ? AND id <= ?', (last_id, max_id))
+        rolled_up = cursor.fetchone()[0]
+        
+        cursor.execute(
+            "UPDATE rollup_state SET last_history_id = ? WHERE name = 'stock_movement_daily'",
+            (max_id,)
+        )
+    
+    return rolled_up
+
+def get_stock_movement_report(start_day: Optional[str] = None, end_day: Optional[str] = None,
+                              medication_id: Optional[int] = None, per_medication: bool = True) -> List[Dict]:
+    """
+    Get daily stock movement from the rollups plus the rows not rolled up yet
+    
+    Args:
+        start_day (str, optional): First day to include, as YYYY-MM-DD
+        end_day (str, optional): Last day to include, as YYYY-MM-DD
+        medication_id (int, optional): Restrict the report to one medication
+        per_medication (bool): One row per day and medication when True,
+            one row per day across all medications when False
+    
+    Returns:
+        List[Dict]: Rows with day, qty_in, qty_out, net and events, plus
+            medication_id and name when per_medication is set; newest day first
+    """
+    clauses, params = [], []
+    if start_day:
+        clauses.append('day >= ?')
+        params.append(start_day)
+    if end_day:
+        clauses.append('day <= ?')
+        params.append(end_day)
+    if medication_id is not None:
+        clauses.append('medication_id = ?')
+        params.append(medication_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    
+    keys = 'movement.day, movement.medication_id, m.name' if per_medication else 'movement.day'
+    join = 'LEFT JOIN medications m ON m.id = movement.medication_id' if per_medication else ''
+    
+    query = f'''
+    SELECT {keys},
+           SUM(qty_in) AS qty_in, SUM(qty_out) AS qty_out, SUM(net) AS net, SUM(events) AS events
+    FROM (
+        SELECT day, medication_id, qty_in, qty_out, net, events
+        FROM stock_movement_daily {where}
+        UNION ALL
+        SELECT * FROM (
+            SELECT {_MOVEMENT_COLUMNS}
+            FROM stock_history
+            WHERE id > (SELECT last_history_id FROM rollup_state WHERE name = 'stock_movement_daily')
+              AND medication_id IS NOT NULL
+            GROUP BY day, medication_id
+        ) {where}
+    ) AS movement
+    {join}
+    GROUP BY {keys}
+    ORDER BY movement.day DESC{', m.name' if per_medication else ''}
+    '''
+    
+    db = Database()
+    with db.get_cursor() as cursor:
+        cursor.execute(query, params + params)
+        report = [dict(row) for row in cursor.fetchall()]
+    
+    return report
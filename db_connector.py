@@ -3,8 +3,13 @@
 
 import pymssql
 import os
+import re
 import logging
-from typing import Dict, List, Optional, Union, Tuple, Any
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Union, Tuple, Any
 import hashlib
 from datetime import datetime
 
@@ -19,21 +24,230 @@ logging.basicConfig(
 )
 logger = logging.getLogger("MediTracx")
 
+# Errors meaning the connection itself may be gone, not just the statement
+CONNECTION_ERRORS = (pymssql.OperationalError, pymssql.InterfaceError)
+
+# Plain SELECTs can be re-run after a dropped connection; anything else may
+# have committed just before the connection went
+READ_ONLY_QUERY = re.compile(r'^\s*SELECT\b(?!.*\bINTO\b)', re.IGNORECASE | re.DOTALL)
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free in time"""
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of pymssql connections.
+    
+    Threads check a connection out, use it and return it, so several threads
+    can run queries in parallel over sessions that stay open between calls.
+    At most max_size connections exist at once; further checkouts wait.
+    Connections idle longer than ping_after are pinged before reuse and
+    replaced if dead, and ones idle longer than max_idle are closed.
+    """
+    def __init__(self, connect_args: Dict, max_size: int = 8, max_idle: float = 300.0,
+                 ping_after: float = 30.0, timeout: float = 30.0):
+        """
+        Args:
+            connect_args (Dict): Keyword arguments for pymssql.connect
+            max_size (int): Most connections open at once
+            max_idle (float): Seconds after which an idle connection is closed
+            ping_after (float): Seconds of idleness after which a connection is
+                checked with a ping before it is handed out
+            timeout (float): Seconds acquire() waits for a free connection
+        """
+        self.connect_args = connect_args
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self._idle = deque()  # (connection, returned at), most recently returned last
+        self._size = 0  # idle plus checked-out connections
+        self._available = threading.Condition(threading.Lock())
+        self.closed = False
+    
+    def _open(self):
+        conn = pymssql.connect(**self.connect_args)
+        logger.info(f"Opened pooled connection to {self.connect_args.get('database')} "
+                    f"on {self.connect_args.get('server')}")
+        return conn
+    
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    @staticmethod
+    def is_alive(conn) -> bool:
+        """
+        Check a connection with a round trip to the server
+        """
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+    
+    def _evict_idle(self):
+        """
+        Close connections idle longer than max_idle (lock held)
+        """
+        cutoff = time.monotonic() - self.max_idle
+        # The oldest returns are at the left
+        while self._idle and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._close(conn)
+    
+    def acquire(self, timeout: Optional[float] = None, verify: bool = False):
+        """
+        Check out a live connection, opening one if the pool is not full
+        
+        Args:
+            timeout (float, optional): Seconds to wait instead of the pool's timeout
+            verify (bool): Ping a reused connection however recently it was used
+        
+        Raises:
+            PoolTimeout: No connection became free within the timeout
+            pymssql.InterfaceError: The pool has been closed
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            with self._available:
+                self._evict_idle()
+                while not self._idle and self._size >= self.max_size:
+                    if self.closed:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No database connection free after {self.max_size} in use")
+                    self._available.wait(remaining)
+                if self.closed:
+                    raise pymssql.InterfaceError("Connection pool is closed")
+                
+                if self._idle:
+                    # Reuse the most recently returned, warmest connection
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1
+            
+            # Network round trips happen outside the lock
+            if conn is None:
+                try:
+                    return self._open()
+                except Exception:
+                    self._discarded()
+                    raise
+            recent = not verify and time.monotonic() - returned_at < self.ping_after
+            if recent or self.is_alive(conn):
+                return conn
+            
+            logger.warning("Dropping dead pooled connection")
+            self._close(conn)
+            self._discarded()
+    
+    def release(self, conn, discard: bool = False, clean: bool = False):
+        """
+        Return a checked-out connection to the pool
+        
+        Uncommitted work is rolled back so the next user starts clean, unless
+        the caller passes clean=True because it has just committed or only
+        ran plain SELECTs, which hold no locks once they finish. A connection
+        that cannot roll back, one passed with discard=True, or one returned
+        after close_all() is closed instead.
+        """
+        if not discard and not clean:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        
+        with self._available:
+            if not discard and not self.closed:
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+                return
+        
+        self._close(conn)
+        self._discarded()
+    
+    def _discarded(self):
+        with self._available:
+            self._size -= 1
+            self._available.notify()
+    
+    @contextmanager
+    def connection(self):
+        """
+        Check a connection out for the duration of a with block
+        
+        A connection error inside the block that leaves the connection dead
+        discards it instead of returning it to the pool.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except CONNECTION_ERRORS:
+            self.release(conn, discard=not self.is_alive(conn))
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+    
+    def close_all(self):
+        """
+        Close the pool and every idle connection
+        
+        Checked-out connections are closed when they are returned, and
+        acquire() fails from now on.
+        """
+        with self._available:
+            self.closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close(conn)
+            self._available.notify_all()
+    
+    def stats(self) -> Dict:
+        """
+        Get the number of open, idle and checked-out connections
+        """
+        with self._available:
+            return {'open': self._size, 'idle': len(self._idle), 'in_use': self._size - len(self._idle)}
+
 class MediTracxDB:
     """
     Database connector class to interface with the MediTracx SQL Server database.
     Provides methods to execute stored procedures and queries.
+    
+    Connections come from a ConnectionPool, so the methods can be called
+    from several threads at once. Each call checks a connection out, runs
+    and commits anything but a plain SELECT; calls made inside transaction()
+    share one connection and commit together.
     """
     _instance = None
+    _instance_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(MediTracxDB, cls).__new__(cls)
-            cls._instance.conn = None
-            cls._instance.cursor = None
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(MediTracxDB, cls).__new__(cls)
+                    instance.pool = None
+                    instance._local = threading.local()  # the thread's transaction connection
+                    cls._instance = instance
         return cls._instance
 
-    def connect(self, server="localhost", database="MediTracx", user="sa", password="YourPassword", as_dict=True):
+    def connect(self, server="localhost", database="MediTracx", user="sa", password="YourPassword", as_dict=True,
+                max_connections=8):
         """
         Connect to the MS SQL Server database
         
@@ -43,98 +257,278 @@ class MediTracxDB:
             user (str): SQL Server login username
             password (str): SQL Server login password
             as_dict (bool): Return rows as dictionaries instead of tuples
+            max_connections (int): Size of the connection pool
         """
+        self.close()
+        pool = ConnectionPool(
+            dict(server=server, user=user, password=password, database=database, as_dict=as_dict),
+            max_size=max_connections
+        )
         try:
-            self.conn = pymssql.connect(
-                server=server,
-                user=user,
-                password=password,
-                database=database,
-                as_dict=as_dict
-            )
-            self.cursor = self.conn.cursor()
-            logger.info(f"Connected to database {database} on {server}")
-            return True
+            # Open the first connection now so bad settings fail here
+            pool.release(pool.acquire())
         except Exception as e:
             logger.error(f"Database connection error: {str(e)}")
             return False
+        
+        self.pool = pool
+        logger.info(f"Connected to database {database} on {server}")
+        return True
 
     def close(self):
-        """Close the database connection"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.cursor = None
+        """Close the pooled database connections"""
+        if self.pool:
+            self.pool.close_all()
+            self.pool = None
             logger.info("Database connection closed")
 
     def commit(self):
-        """Commit changes to the database"""
-        if self.conn:
-            self.conn.commit()
+        """
+        Commit the calling thread's open transaction early
+        
+        Calls made outside transaction() commit on their own, so this is
+        only needed inside one.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.commit()
+
+    @property
+    def in_transaction(self) -> bool:
+        """
+        Whether the calling thread is inside transaction()
+        """
+        return getattr(self._local, 'conn', None) is not None
 
-    def execute_stored_procedure(self, procedure_name: str, params: tuple = None) -> Optional[List[Dict]]:
+    @contextmanager
+    def transaction(self):
+        """
+        Run several calls on one pooled connection and commit them together
+        
+        The calls made by this thread inside the with block share the
+        connection; it commits on success and rolls back on an exception.
+        A failing execute_query or execute_stored_procedure raises inside the
+        block instead of returning None, so one failed statement aborts all.
+        Nested blocks join the outer transaction.
+        
+        Yields:
+            The pooled connection
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self._local.conn
+            return
+        
+        conn = self.pool.acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except CONNECTION_ERRORS:
+            self.pool.release(conn, discard=not self.pool.is_alive(conn))
+            raise
+        except BaseException:
+            self.pool.release(conn)
+            raise
+        else:
+            # Committed, so there is nothing to roll back
+            self.pool.release(conn, clean=True)
+        finally:
+            self._local.conn = None
+
+    def _run(self, work: Callable, retry: bool = False, read_only: bool = False):
+        """
+        Run work(cursor) on the thread's transaction or a pooled connection
+        
+        Outside a transaction the work is committed unless read_only says it
+        only reads, and the connection goes back without a rollback, so a read
+        costs one round trip and a write two. With retry set, work that failed
+        because the connection had died is run once more on a fresh
+        connection; only set it for work that is safe to repeat, since a
+        write can commit on the server just before the connection drops.
+        Dead connections found before the work is sent are replaced by
+        acquire() either way.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            cursor = conn.cursor()
+            try:
+                return work(cursor)
+            finally:
+                cursor.close()
+        
+        for attempt in (1, 2):
+            # After a lost connection, the idle ones may have died with it
+            conn = self.pool.acquire(verify=attempt == 2)
+            try:
+                cursor = conn.cursor()
+                result = work(cursor)
+                if not read_only:
+                    conn.commit()
+            except CONNECTION_ERRORS:
+                alive = self.pool.is_alive(conn)
+                self.pool.release(conn, discard=not alive)
+                if alive or not retry or attempt == 2:
+                    raise
+                logger.warning("Database connection lost, reconnecting")
+                continue
+            except BaseException:
+                self.pool.release(conn)
+                raise
+            self.pool.release(conn, clean=True)
+            return result
+
+    def execute_stored_procedure(self, procedure_name: str, params: tuple = None,
+                                 retry: bool = False) -> Optional[List[Dict]]:
         """
         Execute a stored procedure
         
         Args:
             procedure_name (str): Name of the stored procedure
             params (tuple): Parameters for the stored procedure
+            retry (bool): Re-run the call if the connection drops; only for
+                procedures that do not write
             
         Returns:
             Optional[List[Dict]]: Results as a list of dictionaries, or None on error
+        
+        Raises:
+            Exception: The driver error, inside transaction() only
         """
-        if not self.conn:
+        if not self.pool:
             logger.error("No database connection")
             return None
         
-        try:
+        def call(cursor):
             if params:
-                self.cursor.callproc(procedure_name, params)
+                cursor.callproc(procedure_name, params)
             else:
-                self.cursor.callproc(procedure_name)
+                cursor.callproc(procedure_name)
             
             # Fetch results if any
             results = []
-            for result_set in self.cursor.stored_results():
+            for result_set in cursor.stored_results():
                 results.extend(result_set.fetchall())
             return results
+        
+        try:
+            return self._run(call, retry=retry)
         except Exception as e:
             logger.error(f"Error executing stored procedure {procedure_name}: {str(e)}")
+            if self.in_transaction:
+                # Let transaction() roll back instead of committing the other calls
+                raise
             return None
 
-    def execute_query(self, query: str, params: tuple = None) -> Optional[List[Dict]]:
+    def execute_query(self, query: str, params: tuple = None,
+                      retry: Optional[bool] = None) -> Optional[List[Dict]]:
         """
         Execute an SQL query
         
         Args:
             query (str): SQL query to execute
             params (tuple): Parameters for the query
+            retry (bool, optional): Re-run the query if the connection drops;
+                by default only plain SELECTs are re-run
             
         Returns:
             Optional[List[Dict]]: Results as a list of dictionaries, or None on error
+        
+        Raises:
+            Exception: The driver error, inside transaction() only
         """
-        if not self.conn:
+        if not self.pool:
             logger.error("No database connection")
             return None
         
-        try:
+        def run(cursor):
             if params:
-                self.cursor.execute(query, params)
+                cursor.execute(query, params)
             else:
-                self.cursor.execute(query)
+                cursor.execute(query)
             
-            results = self.cursor.fetchall()
-            return results
+            # Statements without a result set have nothing to fetch
+            return cursor.fetchall() if cursor.description else []
+        
+        try:
+            read_only = bool(READ_ONLY_QUERY.match(query))
+            if retry is None:
+                retry = read_only
+            return self._run(run, retry=retry, read_only=read_only)
         except Exception as e:
             logger.error(f"Error executing query: {str(e)}")
+            if self.in_transaction:
+                # Let transaction() roll back instead of committing the other calls
+                raise
             return None
     
+    def iter_query(self, query: str, params: tuple = None, batch_size: int = 500) -> Iterator[Dict]:
+        """
+        Execute an SQL query and stream its rows
+        
+        Rows are fetched batch_size at a time, so only one batch is in memory
+        however large the result is. The pooled connection stays checked out
+        until the rows run out or the caller stops early (break, or close()
+        on the returned generator); either way the cursor is closed and the
+        connection returned. Inside transaction() the thread's connection is
+        used instead.
+        
+        Args:
+            query (str): SQL query to execute
+            params (tuple): Parameters for the query
+            batch_size (int): Rows fetched per round trip
+            
+        Yields:
+            Dict: One result row
+        
+        Raises:
+            Exception: The driver error, after logging it; unlike execute_query,
+                a failure part-way cannot be reported as None
+        """
+        if not self.pool:
+            logger.error("No database connection")
+            return
+        
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield from self._stream(conn, query, params, batch_size)
+            return
+        
+        with self.pool.connection() as conn:
+            yield from self._stream(conn, query, params, batch_size)
+    
+    def _stream(self, conn, query: str, params: Optional[tuple], batch_size: int) -> Iterator[Dict]:
+        cursor = conn.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            if not cursor.description:
+                return
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            raise
+        finally:
+            cursor.close()
+    
     # ========================
     # Patient Management
     # ========================
+    ALL_PATIENTS_QUERY = "SELECT * FROM patients ORDER BY FName, LName"
+    
     def get_all_patients(self) -> Optional[List[Dict]]:
         """Get all patients from the database"""
-        return self.execute_query("SELECT * FROM patients ORDER BY FName, LName")
+        return self.execute_query(self.ALL_PATIENTS_QUERY)
+    
+    def iter_patients(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream all patients, batch_size rows at a time"""
+        return self.iter_query(self.ALL_PATIENTS_QUERY, batch_size=batch_size)
     
     def get_patient_by_id(self, patient_id: str) -> Optional[Dict]:
         """Get a patient by ID"""
@@ -148,7 +542,6 @@ class MediTracxDB:
         try:
             params = (patient_id, fname, lname, age, gender, phone, email, address)
             self.execute_stored_procedure("InsertPatient", params)
-            self.commit()
             logger.info(f"Patient {patient_id} added successfully")
             return True
         except Exception as e:
@@ -159,7 +552,6 @@ class MediTracxDB:
         """Update a patient's email using stored procedure"""
         try:
             self.execute_stored_procedure("UpdatePatientEmail", (patient_id, email))
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error updating patient email: {str(e)}")
@@ -169,7 +561,6 @@ class MediTracxDB:
         """Delete a patient using stored procedure"""
         try:
             self.execute_stored_procedure("DeletePatient", (patient_id,))
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error deleting patient: {str(e)}")
@@ -238,7 +629,6 @@ class MediTracxDB:
             
             params = (pharmacist_id, name, username, hashed_password, role)
             self.execute_stored_procedure("InsertPharmacist", params)
-            self.commit()
             logger.info(f"Pharmacist {pharmacist_id} added successfully")
             return True
         except Exception as e:
@@ -252,7 +642,6 @@ class MediTracxDB:
             hashed_password = hashlib.sha256(password.encode()).hexdigest()
             
             self.execute_stored_procedure("UpdatePharmacistPassword", (pharmacist_id, hashed_password))
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error updating pharmacist password: {str(e)}")
@@ -262,7 +651,6 @@ class MediTracxDB:
         """Delete a pharmacist using stored procedure"""
         try:
             self.execute_stored_procedure("DeletePharmacist", (pharmacist_id,))
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error deleting pharmacist: {str(e)}")
@@ -305,7 +693,6 @@ class MediTracxDB:
             params = (product_id, name, batch_no, expiry_date, quantity, 
                      unit_price, reorder_level, manufacturer_id)
             self.execute_stored_procedure("InsertProduct", params)
-            self.commit()
             logger.info(f"Product {product_id} added successfully")
             return True
         except Exception as e:
@@ -316,7 +703,6 @@ class MediTracxDB:
         """Update a product's quantity using stored procedure"""
         try:
             self.execute_stored_procedure("UpdateProductQuantity", (product_id, quantity))
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error updating product quantity: {str(e)}")
@@ -326,7 +712,6 @@ class MediTracxDB:
         """Delete a product using stored procedure"""
         try:
             self.execute_stored_procedure("DeleteProduct", (product_id,))
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error deleting product: {str(e)}")
@@ -335,9 +720,15 @@ class MediTracxDB:
     # ========================
     # Sale Management
     # ========================
+    ALL_SALES_QUERY = "SELECT * FROM sales ORDER BY Sale_Date DESC"
+    
     def get_all_sales(self) -> Optional[List[Dict]]:
         """Get all sales from the database"""
-        return self.execute_query("SELECT * FROM sales ORDER BY Sale_Date DESC")
+        return self.execute_query(self.ALL_SALES_QUERY)
+    
+    def iter_sales(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream all sales, newest first, batch_size rows at a time"""
+        return self.iter_query(self.ALL_SALES_QUERY, batch_size=batch_size)
     
     def get_sale_by_id(self, sale_id: str) -> Optional[Dict]:
         """Get a sale by ID with its items"""
@@ -387,7 +778,6 @@ class MediTracxDB:
         try:
             params = (sale_id, patient_id, total_amount, sale_date, status, pharmacist_id)
             self.execute_stored_procedure("InsertSale", params)
-            self.commit()
             logger.info(f"Sale {sale_id} added successfully")
             return True
         except Exception as e:
@@ -399,7 +789,6 @@ class MediTracxDB:
         try:
             params = (sale_id, product_id, quantity, subtotal)
             self.execute_stored_procedure("InsertSaleItem", params)
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error inserting sale item: {str(e)}")
@@ -409,7 +798,6 @@ class MediTracxDB:
         """Update a sale's status using stored procedure"""
         try:
             self.execute_stored_procedure("UpdateSaleStatus", (sale_id, status))
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error updating sale status: {str(e)}")
@@ -418,16 +806,17 @@ class MediTracxDB:
     def delete_sale(self, sale_id: str) -> bool:
         """Delete a sale using stored procedure"""
         try:
-            # Delete related records from sale_items
-            self.execute_query("DELETE FROM sale_items WHERE Sale_ID = %s", (sale_id,))
-            
-            # Delete from payment tables
-            self.execute_query("DELETE FROM cash_sales WHERE Sale_ID = %s", (sale_id,))
-            self.execute_query("DELETE FROM credit_sales WHERE Sale_ID = %s", (sale_id,))
-            
-            # Delete the sale
-            self.execute_stored_procedure("DeleteSale", (sale_id,))
-            self.commit()
+            # One pooled connection for every statement, committed together
+            with self.transaction():
+                # Delete related records from sale_items
+                self.execute_query("DELETE FROM sale_items WHERE Sale_ID = %s", (sale_id,))
+                
+                # Delete from payment tables
+                self.execute_query("DELETE FROM cash_sales WHERE Sale_ID = %s", (sale_id,))
+                self.execute_query("DELETE FROM credit_sales WHERE Sale_ID = %s", (sale_id,))
+                
+                # Delete the sale
+                self.execute_stored_procedure("DeleteSale", (sale_id,))
             return True
         except Exception as e:
             logger.error(f"Error deleting sale: {str(e)}")
@@ -436,15 +825,21 @@ class MediTracxDB:
     # ========================
     # Prescription Management
     # ========================
+    ALL_PRESCRIPTIONS_QUERY = """
+        SELECT p.*, pt.FName + ' ' + pt.LName AS PatientName, ph.Name AS PharmacistName
+        FROM prescriptions p
+        JOIN patients pt ON p.Patient_ID = pt.Patient_ID
+        JOIN pharmacists ph ON p.Pharmacist_ID = ph.Pharmacist_ID
+        ORDER BY p.Date_Issued DESC
+    """
+    
     def get_all_prescriptions(self) -> Optional[List[Dict]]:
         """Get all prescriptions from the database"""
-        return self.execute_query("""
-            SELECT p.*, pt.FName + ' ' + pt.LName AS PatientName, ph.Name AS PharmacistName
-            FROM prescriptions p
-            JOIN patients pt ON p.Patient_ID = pt.Patient_ID
-            JOIN pharmacists ph ON p.Pharmacist_ID = ph.Pharmacist_ID
-            ORDER BY p.Date_Issued DESC
-        """)
+        return self.execute_query(self.ALL_PRESCRIPTIONS_QUERY)
+    
+    def iter_prescriptions(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream all prescriptions, newest first, batch_size rows at a time"""
+        return self.iter_query(self.ALL_PRESCRIPTIONS_QUERY, batch_size=batch_size)
     
     def get_prescription_by_id(self, prescription_id: str) -> Optional[Dict]:
         """Get a prescription by ID with its details"""
@@ -489,7 +884,6 @@ class MediTracxDB:
                 VALUES (%s, %s, %s, %s)
             """
             self.execute_query(query, (prescription_id, patient_id, pharmacist_id, date_issued))
-            self.commit()
             logger.info(f"Prescription {prescription_id} added successfully")
             return True
         except Exception as e:
@@ -505,7 +899,6 @@ class MediTracxDB:
                 VALUES (%s, %s, %s, %s)
             """
             self.execute_query(query, (prescription_id, product_id, dosage, duration))
-            self.commit()
             return True
         except Exception as e:
             logger.error(f"Error inserting prescription detail: {str(e)}")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from typing import Callable, Dict, Optional
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import QLabel
+
+from database import Database
+
+class TaskSignals(QObject):
+    """
+    Signals a DatabaseTask emits from its worker thread.
+    
+    They carry the task itself so the receiving TaskRunner, which lives on
+    the GUI thread, can match the result to its callbacks.
+    """
+    finished = pyqtSignal(object, object)  # task, result
+    failed = pyqtSignal(object, str)  # task, error message
+
+class DatabaseTask(QRunnable):
+    """
+    One database call run on a QThreadPool worker.
+    
+    The call runs inside Database.connection(), so it checks a connection out
+    of the database pool and returns it when done. Thread-local state cannot
+    carry a connection from one task to the next, because PyQt gives every
+    run() a fresh Python thread state.
+    """
+    def __init__(self, key: str, fn: Callable, args=(), kwargs=None):
+        super().__init__()
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def cancel(self):
+        """
+        Drop the task's result
+        
+        A task that has not started yet never runs. A query already running
+        finishes on its worker, but no signal is emitted for it.
+        """
+        self._cancelled.set()
+    
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            with Database().connection():
+                result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self, str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self, result)
+
+class TaskRunner(QObject):
+    """
+    Runs database calls off the GUI thread and delivers results by callback.
+    
+    Tasks are submitted under a key, usually one per page or table. Submitting
+    a new task under a key cancels the one still outstanding for it, so a
+    stale result never overwrites a newer one. busy_changed reports when a
+    key starts and stops having work in flight, for loading indicators.
+    Callbacks always run on the GUI thread.
+    """
+    busy_changed = pyqtSignal(str, bool)  # key, busy
+    failed = pyqtSignal(str, str)  # key, error message
+    
+    def __init__(self, parent=None, pool: Optional[QThreadPool] = None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._tasks: Dict[str, DatabaseTask] = {}
+        self._callbacks: Dict[DatabaseTask, tuple] = {}
+    
+    def submit(self, key: str, fn: Callable, *args, on_result: Optional[Callable] = None,
+               on_error: Optional[Callable] = None, report_errors: bool = True, **kwargs) -> DatabaseTask:
+        """
+        Run fn(*args, **kwargs) on the thread pool
+        
+        Args:
+            key (str): Name of the work, e.g. 'medications' or 'cards'
+            fn (Callable): Database function to call
+            on_result (Callable, optional): Called with fn's return value
+            on_error (Callable, optional): Called with the error message if fn
+                raises
+            report_errors (bool): Also emit failed if fn raises; turn off for
+                background work whose on_error deals with the error itself
+        
+        Returns:
+            DatabaseTask: The submitted task
+        """
+        was_busy = self.is_busy(key)
+        self._discard(self._tasks.pop(key, None))
+        
+        task = DatabaseTask(key, fn, args, kwargs)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self._tasks[key] = task
+        self._callbacks[task] = (on_result, on_error, report_errors)
+        self.pool.start(task)
+        
+        if not was_busy:
+            self.busy_changed.emit(key, True)
+        return task
+    
+    def is_busy(self, key: str) -> bool:
+        """
+        Check whether a task is outstanding under a key
+        """
+        return key in self._tasks
+    
+    def cancel(self, key: str):
+        """
+        Cancel the task outstanding under a key, if any
+        """
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            self._discard(task)
+            self.busy_changed.emit(key, False)
+    
+    def cancel_all(self):
+        """
+        Cancel every outstanding task, e.g. when the window closes
+        """
+        for key in list(self._tasks):
+            self.cancel(key)
+    
+    def _discard(self, task: Optional[DatabaseTask]):
+        if task is None:
+            return
+        task.cancel()
+        self._callbacks.pop(task, None)
+    
+    def _finish(self, task: DatabaseTask):
+        """
+        Forget a completed task; returns its callbacks, or None if it was replaced
+        """
+        if self._tasks.get(task.key) is not task:
+            return None
+        del self._tasks[task.key]
+        self.busy_changed.emit(task.key, False)
+        return self._callbacks.pop(task, None)
+    
+    def _on_finished(self, task, result):
+        callbacks = self._finish(task)
+        if callbacks and callbacks[0]:
+            callbacks[0](result)
+    
+    def _on_failed(self, task, message):
+        callbacks = self._finish(task)
+        if callbacks is None:
+            return
+        if callbacks[2]:
+            self.failed.emit(task.key, message)
+        if callbacks[1]:
+            callbacks[1](message)
+
+
+def loading_label(runner: TaskRunner, *keys: str, text: str = "Loading...") -> QLabel:
+    """
+    Create a label that is only visible while a task runs under one of keys
+    
+    Args:
+        runner (TaskRunner): Runner the tasks are submitted to
+        keys (str): Task keys of the page the label belongs to
+        text (str): Label text
+    
+    Returns:
+        QLabel: The label, initially hidden unless one of keys is busy
+    """
+    label = QLabel(text)
+    label.setObjectName("loadingLabel")
+    busy = {key for key in keys if runner.is_busy(key)}
+    label.setVisible(bool(busy))
+    
+    def on_busy_changed(key, is_busy):
+        if key not in keys:
+            return
+        if is_busy:
+            busy.add(key)
+        else:
+            busy.discard(key)
+        label.setVisible(bool(busy))
+    
+    runner.busy_changed.connect(on_busy_changed)
+    return label
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import argparse
+
+from database import Database, init_database, iter_medication_rows, import_medications
+
+def main():
+    """
+    Command-line entry point for bulk importing a medication catalog.
+    Streams a CSV, JSON Lines or JSON file into the pharmacy database.
+    """
+    parser = argparse.ArgumentParser(description="Bulk import medications into the pharmacy database")
+    parser.add_argument('path', help="CSV, JSON Lines (.jsonl) or JSON file to import")
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'json'],
+                        help="file format (default: guessed from the extension)")
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help="rows inserted per transaction (default: 1000)")
+    parser.add_argument('--profile', help="database connection profile to use")
+    args = parser.parse_args()
+    
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+    
+    # Initialize database
+    Database().connect(args.profile)
+    init_database()
+    
+    def show_progress(report):
+        print(f"\r{report['inserted']} inserted, {report['rejected']} rejected "
+              f"({report['rows_per_second']:.0f} rows/s)", end='', flush=True)
+    
+    try:
+        rows = iter_medication_rows(args.path, args.format)
+        report = import_medications(rows, chunk_size=args.chunk_size, progress=show_progress)
+    except (OSError, ValueError) as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    
+    print()
+    for row_number, message in report['errors']:
+        print(f"Row {row_number}: {message}", file=sys.stderr)
+    print(f"Read {report['read']} rows: {report['inserted']} inserted, {report['rejected']} rejected "
+          f"in {report['elapsed']:.2f}s ({report['rows_per_second']:.0f} rows/s)")
+    
+    return 0 if report['rejected'] == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,9 +10,10 @@ from PyQt5.QtGui import QIcon, QPixmap, QFont
 
 from database import authenticate_user
 from styles import StyleSheet
-from dashboard_admin import AdminDashboard
-from dashboard_pharmacist import PharmacistDashboard
-from registration import RegistrationWindow
+from startup_trace import get_tracer
+
+# The dashboards and the registration window are imported when they are first
+# opened, so the login screen does not pay for them at startup.
 
 class LoginWindow(QMainWindow):
     """
@@ -24,7 +25,8 @@ class LoginWindow(QMainWindow):
         
         self.setWindowTitle("Pharmacy Management System - Login")
         self.setMinimumSize(800, 600)
-        self.setStyleSheet(StyleSheet.MAIN_STYLE)
+        with get_tracer().phase('stylesheet'):
+            self.setStyleSheet(StyleSheet.MAIN_STYLE)
         
         # Create main widget and layout
         main_widget = QWidget()
@@ -157,9 +159,11 @@ class LoginWindow(QMainWindow):
             
             # Open appropriate dashboard based on role
             if user['role'] == 'admin':
+                from dashboard_admin import AdminDashboard
                 self.admin_dashboard = AdminDashboard(user)
                 self.admin_dashboard.show()
             elif user['role'] == 'pharmacist':
+                from dashboard_pharmacist import PharmacistDashboard
                 self.pharmacist_dashboard = PharmacistDashboard(user)
                 self.pharmacist_dashboard.show()
                 
@@ -173,6 +177,7 @@ class LoginWindow(QMainWindow):
         """
         Open the registration window
         """
+        from registration import RegistrationWindow
         self.registration_window = RegistrationWindow(self)
         self.registration_window.show()
         self.hide()
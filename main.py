@@ -1,10 +1,68 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import time
+
+# Taken before any other import so the startup budget covers module loading
+PROCESS_START = time.perf_counter()
+
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
-from login import LoginWindow
-from database import init_database
+import logging
+from startup_trace import configure_tracer
+
+# Opt-in with --trace-startup[=PATH] or MEDITRAX_STARTUP_TRACE=PATH
+tracer = configure_tracer(PROCESS_START, sys.argv)
+
+with tracer.phase('import PyQt5'):
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QObject, QEvent, QTimer
+with tracer.phase('import database'):
+    from database import init_database
+with tracer.phase('import login'):
+    from login import LoginWindow
+
+# Target time from launch until the login window has painted, in milliseconds.
+# Override with the MEDITRAX_STARTUP_BUDGET_MS environment variable.
+STARTUP_BUDGET_MS = 1500
+
+logger = logging.getLogger(__name__)
+
+class FirstPaintWatcher(QObject):
+    """
+    Event filter that reports once the watched window has painted for the first time
+    """
+    def __init__(self, window, callback):
+        super().__init__(window)
+        self.callback = callback
+        window.installEventFilter(self)
+    
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            # Let the paint event finish before taking the timestamp
+            QTimer.singleShot(0, self.callback)
+        return False
+
+def check_startup_budget():
+    """
+    Compare the time taken to show the login window against the startup budget
+    """
+    elapsed_ms = (time.perf_counter() - PROCESS_START) * 1000
+    budget_ms = float(os.environ.get('MEDITRAX_STARTUP_BUDGET_MS', STARTUP_BUDGET_MS))
+    if elapsed_ms > budget_ms:
+        logger.warning("Startup took %.0f ms, over the %.0f ms budget", elapsed_ms, budget_ms)
+    return elapsed_ms
+
+def startup_finished():
+    """
+    Close the startup timeline once the login window is on screen
+    """
+    tracer.mark('login window painted')
+    check_startup_budget()
+    path = tracer.write()
+    if path:
+        print(f"Startup timeline written to {path}")
 
 def main():
     """
@@ -12,17 +70,23 @@ def main():
     Creates the application and shows the login window.
     """
     # Initialize database
-    init_database()
+    with tracer.phase('init_database'):
+        init_database()
     
     # Create application
-    app = QApplication(sys.argv)
+    with tracer.phase('QApplication'):
+        app = QApplication(sys.argv)
     
     # Show login window
-    login_window = LoginWindow()
-    login_window.show()
+    with tracer.phase('LoginWindow'):
+        login_window = LoginWindow()
+    with tracer.phase('show'):
+        login_window.show()
+    
+    FirstPaintWatcher(login_window, startup_finished)
     
     # Execute application
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import bisect
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QPoint, pyqtSignal
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QAbstractItemView
+
+from database import LOW_STOCK_THRESHOLD, get_medications_page
+from db_tasks import TaskRunner
+
+# Role returning the medication id of a row, whatever the column
+MEDICATION_ID_ROLE = Qt.UserRole
+
+def stock_status(stock: int):
+    """
+    Get the status text and colour shown for a stock level
+    """
+    if stock <= 0:
+        return "Out of Stock", QColor("#F44336")  # Red
+    if stock <= LOW_STOCK_THRESHOLD:
+        return "Low Stock", QColor("#FFC107")  # Amber
+    return "In Stock", QColor("#4CAF50")  # Green
+
+# Columns a MedicationTableModel can show: key -> (header, display function)
+MEDICATION_TABLE_COLUMNS = {
+    'id': ("ID", lambda med: str(med['id'])),
+    'name': ("Name", lambda med: med['name']),
+    'category': ("Category", lambda med: med['category']),
+    'stock': ("Stock", lambda med: str(med['stock'])),
+    'price': ("Price", lambda med: f"${med['price']:.2f}"),
+    'status': ("Status", lambda med: stock_status(med['stock'])[0]),
+    'actions': ("Actions", lambda med: None),
+}
+
+class MedicationTableModel(QAbstractTableModel):
+    """
+    Table model over a list of medication dicts, shared by the admin
+    medications table and the pharmacist inventory table.
+    
+    Views only ask for the cells they paint, so a reload costs one model reset
+    instead of an item object per cell. Single-row changes emit dataChanged,
+    rowsInserted or rowsRemoved for just that row.
+    """
+    def __init__(self, columns: List[str], parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self._medications: List[Dict] = []
+        self._rows: Dict[int, int] = {}  # medication id -> row
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._medications)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return MEDICATION_TABLE_COLUMNS[self.columns[section]][0]
+        return QVariant()
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        
+        med = self._medications[index.row()]
+        column = self.columns[index.column()]
+        
+        if role == Qt.DisplayRole:
+            return MEDICATION_TABLE_COLUMNS[column][1](med)
+        if role == Qt.ForegroundRole and column == 'status':
+            return stock_status(med['stock'])[1]
+        if role == MEDICATION_ID_ROLE:
+            return med['id']
+        return QVariant()
+    
+    def column_of(self, key: str) -> int:
+        """
+        Get the index of a column by its key
+        """
+        return self.columns.index(key)
+    
+    def medication_at(self, row: int) -> Dict:
+        """
+        Get the medication shown in a row
+        """
+        return self._medications[row]
+    
+    def row_of(self, medication_id: int) -> Optional[int]:
+        """
+        Get the row showing a medication, or None if it is not in the model
+        """
+        return self._rows.get(medication_id)
+    
+    def set_medications(self, medications: List[Dict]):
+        """
+        Replace every row of the model
+        """
+        self.beginResetModel()
+        self._medications = list(medications)
+        self._reindex()
+        self.endResetModel()
+    
+    def update_medication(self, medication: Dict):
+        """
+        Replace one medication and repaint only its row
+        """
+        row = self._rows.get(medication['id'])
+        if row is None:
+            return
+        self._medications[row] = medication
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+    
+    def insert_medication(self, medication: Dict):
+        """
+        Append a medication as a new row
+        """
+        row = len(self._medications)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._medications.append(medication)
+        self._rows[medication['id']] = row
+        self.endInsertRows()
+    
+    def remove_medication(self, medication_id: int):
+        """
+        Remove the row showing a medication
+        """
+        row = self._rows.get(medication_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._medications[row]
+        self._reindex()
+        self.endRemoveRows()
+    
+    def _reindex(self):
+        self._rows = {med['id']: row for row, med in enumerate(self._medications)}
+
+
+class PagedMedicationModel(MedicationTableModel):
+    """
+    MedicationTableModel that pages rows in from the database as the view
+    scrolls, keeping at most max_rows of them in memory.
+    
+    Scrolling down uses Qt's canFetchMore/fetchMore. Once the window is full,
+    rows are dropped from the far end, and attach_window_scrolling() fetches
+    them back when the user scrolls up again. Pages are read with keyset
+    pagination, so every fetch costs the same however large the catalog is.
+    
+    Given a TaskRunner, pages are read on its thread pool under task_key and
+    inserted when they arrive; only one page request is in flight at a time.
+    Without one, pages are read synchronously.
+    """
+    # Emitted after rows were dropped from one end of the window
+    window_shifted = pyqtSignal()
+    
+    def __init__(self, columns: List[str], page_size: int = 200, max_rows: int = 2000,
+                 order_by: str = 'id', descending: bool = False,
+                 runner: Optional[TaskRunner] = None, task_key: str = 'medications', parent=None):
+        super().__init__(columns, parent)
+        self.runner = runner
+        self.task_key = task_key
+        self.page_size = page_size
+        self.max_rows = max(max_rows, 2 * page_size)
+        self.order_by = order_by
+        self.descending = descending
+        self.filters: Optional[Dict] = None
+        self._next_cursor = None  # cursor after the last loaded row, None at the end
+        self._has_previous = False  # rows before the first loaded row were dropped
+        self._loading = False  # a page request is in flight
+        self._stale_ids = set()  # medications waiting for refresh_medications to re-read them
+    
+    def _cursor_of(self, medication: Dict):
+        return (medication[self.order_by], medication['id'])
+    
+    def _request_page(self, on_page, after=None, descending=None):
+        """
+        Read a page and pass (rows, cursor) to on_page, on the runner if there is one
+        """
+        kwargs = dict(filters=self.filters, order_by=self.order_by, after=after, limit=self.page_size,
+                      descending=self.descending if descending is None else descending)
+        if self.runner is None:
+            on_page(get_medications_page(**kwargs))
+            return
+        
+        def loaded(page):
+            self._loading = False
+            on_page(page)
+        
+        def failed(message):
+            self._loading = False
+        
+        # Replaces any request still in flight, whose rows would be stale
+        self._loading = True
+        self.runner.submit(self.task_key, get_medications_page, on_result=loaded, on_error=failed, **kwargs)
+    
+    @property
+    def loading(self) -> bool:
+        return self._loading
+    
+    def reload(self):
+        """
+        Drop every loaded row and load the first page again
+        """
+        self._request_page(self._reloaded)
+    
+    def _reloaded(self, page):
+        medications, self._next_cursor = page
+        self._has_previous = False
+        self.set_medications(medications)
+    
+    def set_filters(self, filters: Optional[Dict]):
+        """
+        Change the filters applied to the query and reload from the first page
+        """
+        self.filters = filters
+        self.reload()
+    
+    def _sort_key(self, medication: Dict):
+        # Matches get_medications_page: NULLs first, id breaks ties
+        value = medication[self.order_by]
+        return (value is not None, value if value is not None else 0, medication['id'])
+    
+    def insert_medication(self, medication: Dict):
+        """
+        Insert a new medication at its sorted position in the window
+        
+        Rows that sort before or after the loaded window are left for the
+        fetches that will reach them. With filters set, only the database
+        knows whether the medication matches, so the window is reloaded.
+        """
+        if self.filters:
+            self.reload()
+            return
+        self._insert_in_window(medication)
+    
+    def _insert_in_window(self, medication: Dict):
+        if medication['id'] in self._rows:
+            self.update_medication(medication)
+            return
+        
+        keys = [self._sort_key(med) for med in self._medications]
+        if self.descending:
+            keys.reverse()
+        row = bisect.bisect_left(keys, self._sort_key(medication))
+        if self.descending:
+            row = len(keys) - row
+        
+        if (row == 0 and self._has_previous) or (row == len(keys) and self._next_cursor is not None):
+            return
+        
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._medications.insert(row, medication)
+        self._reindex()
+        self.endInsertRows()
+    
+    def refresh_medications(self, medication_ids: List[int]):
+        """
+        Re-read some medications and update, insert or remove just their rows
+        
+        Medications that no longer exist or no longer match the filters are
+        removed; ones that now match are inserted at their sorted position.
+        """
+        self._stale_ids.update(medication_ids)
+        if len(self._stale_ids) > self.page_size:
+            # Cheaper to start over than to patch this many rows
+            self._stale_ids.clear()
+            self.reload()
+            return
+        
+        ids = list(self._stale_ids)
+        filters = {**(self.filters or {}), 'id__in': ids}
+        if self.runner is None:
+            self._refreshed(ids, get_medications_page(filters=filters, limit=len(ids)))
+            return
+        # A newer refresh re-reads these ids too, so replacing this one loses nothing
+        self.runner.submit(f'{self.task_key}_refresh', get_medications_page, filters=filters, limit=len(ids),
+                           on_result=lambda page: self._refreshed(ids, page))
+    
+    def _refreshed(self, ids: List[int], page):
+        medications = {med['id']: med for med in page[0]}
+        self._stale_ids.difference_update(ids)
+        for medication_id in ids:
+            medication = medications.get(medication_id)
+            if medication is None:
+                self.remove_medication(medication_id)
+            elif medication_id not in self._rows:
+                self._insert_in_window(medication)
+            elif self._sort_key(self.medication_at(self._rows[medication_id])) == self._sort_key(medication):
+                self.update_medication(medication)
+            else:
+                # Its sort value changed, so it moves
+                self.remove_medication(medication_id)
+                self._insert_in_window(medication)
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._loading and self._next_cursor is not None
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._request_page(self._fetched, after=self._next_cursor)
+    
+    def _fetched(self, page):
+        medications, self._next_cursor = page
+        if not medications:
+            return
+        
+        first = len(self._medications)
+        self.beginInsertRows(QModelIndex(), first, first + len(medications) - 1)
+        self._medications.extend(medications)
+        self._rows.update((med['id'], first + offset) for offset, med in enumerate(medications))
+        self.endInsertRows()
+        
+        # Keep the window bounded by dropping rows from the top
+        excess = len(self._medications) - self.max_rows
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self._medications[:excess]
+            self._reindex()
+            self.endRemoveRows()
+            self._has_previous = True
+            self.window_shifted.emit()
+    
+    def can_fetch_previous(self) -> bool:
+        """
+        Check whether rows before the first loaded row were dropped
+        """
+        return self._has_previous and not self._loading and bool(self._medications)
+    
+    def fetch_previous(self):
+        """
+        Load the page before the first loaded row
+        """
+        if not self.can_fetch_previous():
+            return
+        
+        # Walk backwards from the first row by reversing the sort order
+        self._request_page(self._fetched_previous, after=self._cursor_of(self._medications[0]),
+                           descending=not self.descending)
+    
+    def _fetched_previous(self, page):
+        medications, _ = page
+        self._has_previous = len(medications) == self.page_size
+        if not medications:
+            return
+        medications.reverse()
+        
+        self.beginInsertRows(QModelIndex(), 0, len(medications) - 1)
+        self._medications[:0] = medications
+        self._reindex()
+        self.endInsertRows()
+        
+        # Keep the window bounded by dropping rows from the bottom
+        excess = len(self._medications) - self.max_rows
+        if excess > 0:
+            first = len(self._medications) - excess
+            self.beginRemoveRows(QModelIndex(), first, len(self._medications) - 1)
+            del self._medications[first:]
+            self._reindex()
+            self.endRemoveRows()
+            self._next_cursor = self._cursor_of(self._medications[-1])
+        
+        self.window_shifted.emit()
+
+def attach_window_scrolling(view: QAbstractItemView, model: PagedMedicationModel):
+    """
+    Keep a view scrolling smoothly over a PagedMedicationModel window
+    
+    Fetches the previous page when the view is scrolled to the top, and keeps
+    the row under the top edge in place when the model shifts its window.
+    """
+    scroll_bar = view.verticalScrollBar()
+    anchor = {'id': None}
+    
+    def remember_top_row():
+        index = view.indexAt(QPoint(0, 0))
+        anchor['id'] = model.medication_at(index.row())['id'] if index.isValid() else None
+    
+    def restore_top_row():
+        row = model.row_of(anchor['id']) if anchor['id'] is not None else None
+        if row is not None:
+            view.scrollTo(model.index(row, 0), QAbstractItemView.PositionAtTop)
+    
+    def on_scrolled(value):
+        remember_top_row()
+        if value == scroll_bar.minimum() and model.can_fetch_previous():
+            model.fetch_previous()
+    
+    scroll_bar.valueChanged.connect(on_scrolled)
+    model.window_shifted.connect(restore_top_row)
+    model.modelReset.connect(remember_top_row)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import Qt, QModelIndex, QTimer, pyqtSignal
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+from PyQt5.QtWidgets import QCompleter, QLineEdit
+
+from database import get_medication_by_id, search_medications
+from db_tasks import TaskRunner
+from medication_model import MEDICATION_ID_ROLE
+
+# Role holding the bare medication name a candidate completes to
+MEDICATION_NAME_ROLE = Qt.UserRole + 1
+
+class MedicationPicker(QLineEdit):
+    """
+    Type-ahead medication selector for forms.
+    
+    Typing runs a full-text search once the user pauses, and only the best
+    matches are offered in a QCompleter popup, so nothing is loaded up front
+    however large the catalog is. Choosing a candidate re-reads it, so the
+    stock reported by medication_selected is current at selection time.
+    """
+    # Emitted with the chosen medication dict, or None when the text is edited again
+    medication_selected = pyqtSignal(object)
+    
+    SEARCH_DELAY_MS = 200
+    MAX_CANDIDATES = 20
+    
+    def __init__(self, runner: TaskRunner, in_stock: bool = True, task_key: str = 'medication_picker',
+                 parent=None):
+        """
+        Args:
+            runner (TaskRunner): Runner the searches are submitted to
+            in_stock (bool): Only offer medications with stock left
+            task_key (str): Task key of the picker's queries
+        """
+        super().__init__(parent)
+        self.runner = runner
+        self.in_stock = in_stock
+        self.task_key = task_key
+        self.medication: Optional[Dict] = None
+        self.setPlaceholderText("Type to search medications")
+        
+        self.candidates = QStandardItemModel(self)
+        self.completer = QCompleter(self.candidates, self)
+        # The search already matched the candidates; show them all as they are
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setCompletionRole(MEDICATION_NAME_ROLE)
+        self.completer.activated[QModelIndex].connect(self._activated)
+        self.setCompleter(self.completer)
+        
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self._search)
+        self.textEdited.connect(self._edited)
+    
+    def _edited(self, text):
+        # A selection still being read would overwrite what was just typed
+        self.runner.cancel(self.task_key)
+        if self.medication is not None:
+            self.medication = None
+            self.medication_selected.emit(None)
+        self.search_timer.start()
+    
+    def _search(self):
+        text = self.text()
+        if not text.strip():
+            self.runner.cancel(self.task_key)
+            self.candidates.clear()
+            return
+        self.runner.submit(self.task_key, search_medications, text, self.MAX_CANDIDATES,
+                           in_stock=self.in_stock, on_result=self._show_candidates)
+    
+    def _show_candidates(self, medications: List[Dict]):
+        if self.medication is not None:
+            return
+        self.candidates.clear()
+        for med in medications:
+            item = QStandardItem(f"{med['name']} ({med['stock']} in stock)")
+            item.setData(med['name'], MEDICATION_NAME_ROLE)
+            item.setData(med['id'], MEDICATION_ID_ROLE)
+            self.candidates.appendRow(item)
+        if medications and self.hasFocus():
+            self.completer.complete()
+    
+    def _activated(self, index):
+        self.search_timer.stop()
+        self.select(index.data(MEDICATION_ID_ROLE))
+    
+    def select(self, medication_id: int):
+        """
+        Choose a medication, reading its current stock
+        """
+        self.runner.submit(self.task_key, get_medication_by_id, medication_id, on_result=self._selected)
+    
+    def refresh(self):
+        """
+        Re-read the chosen medication, e.g. after its stock changed
+        """
+        if self.medication is not None:
+            self.select(self.medication['id'])
+    
+    def _selected(self, medication: Optional[Dict]):
+        self.medication = medication
+        if medication is not None:
+            self.setText(medication['name'])
+        self.medication_selected.emit(medication)
+    
+    def clear_selection(self):
+        """
+        Forget the chosen medication and empty the field
+        """
+        self.search_timer.stop()
+        self.runner.cancel(self.task_key)
+        self.medication = None
+        self.candidates.clear()
+        self.clear()
+        self.medication_selected.emit(None)
@@ -7,7 +7,6 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QPixmap
 from database import register_user, username_exists
-from sql_utils import insert_pharmacist
 from styles import StyleSheet
 
 class RegistrationWindow(QMainWindow):
@@ -166,6 +165,8 @@ class RegistrationWindow(QMainWindow):
             QMessageBox.critical(self, "Error", "Registration failed.")
 
     def register_pharmacist(self):
+        # sql_utils pulls in pyodbc, so only load it when it is actually used
+        from sql_utils import insert_pharmacist
         try:
             pharmacist_id = self.input_id.text()
             name = self.input_name.text()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import platform
+import datetime
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Environment variable and command-line flag that enable the tracer. Both take
+# the path of the timeline file; the bare flag writes DEFAULT_TRACE_FILE.
+TRACE_ENV_VAR = 'MEDITRAX_STARTUP_TRACE'
+TRACE_FLAG = '--trace-startup'
+DEFAULT_TRACE_FILE = 'startup_trace.json'
+
+class StartupTracer:
+    """
+    Opt-in recorder of wall time spent in each startup phase.
+    
+    Phases are timed relative to an origin (normally the moment the process
+    started) and written to a JSON timeline file. A disabled tracer records
+    nothing, so the phase() blocks can stay in place in normal runs.
+    """
+    def __init__(self, origin: Optional[float] = None, output_path: Optional[str] = None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.output_path = output_path
+        self.enabled = output_path is not None
+        self.phases: List[Dict] = []
+        self.marks: List[Dict] = []
+        self._depth = 0
+    
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self.origin) * 1000
+    
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time the enclosed block as a named phase; phases may nest
+        """
+        if not self.enabled:
+            yield
+            return
+        
+        entry = {'name': name, 'depth': self._depth, 'start_ms': self._now_ms()}
+        self.phases.append(entry)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            entry['end_ms'] = self._now_ms()
+            entry['duration_ms'] = entry['end_ms'] - entry['start_ms']
+    
+    def mark(self, name: str):
+        """
+        Record a point in time, e.g. the first paint of a window
+        """
+        if self.enabled:
+            self.marks.append({'name': name, 'at_ms': self._now_ms()})
+    
+    def write(self) -> Optional[str]:
+        """
+        Write the timeline to the output file
+        
+        Returns:
+            str: Path of the written file, None if the tracer is disabled
+        """
+        if not self.enabled:
+            return None
+        
+        timeline = {
+            'recorded_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_ms': self._now_ms(),
+            'phases': self.phases,
+            'marks': self.marks,
+        }
+        with open(self.output_path, 'w', encoding='utf-8') as f:
+            json.dump(timeline, f, indent=2)
+        return self.output_path
+
+_tracer = StartupTracer()
+
+def configure_tracer(origin: float, argv: List[str]) -> StartupTracer:
+    """
+    Create the process-wide tracer, enabled by TRACE_FLAG or TRACE_ENV_VAR
+    
+    The flag is removed from argv so it is not passed on to Qt.
+    
+    Args:
+        origin (float): time.perf_counter() value taken when the process started
+        argv (List[str]): Command-line arguments, usually sys.argv
+    
+    Returns:
+        StartupTracer: The configured tracer, also returned by get_tracer()
+    """
+    global _tracer
+    
+    output_path = os.environ.get(TRACE_ENV_VAR) or None
+    for arg in list(argv[1:]):
+        if arg == TRACE_FLAG:
+            output_path = DEFAULT_TRACE_FILE
+            argv.remove(arg)
+        elif arg.startswith(TRACE_FLAG + '='):
+            output_path = arg.split('=', 1)[1] or DEFAULT_TRACE_FILE
+            argv.remove(arg)
+    
+    _tracer = StartupTracer(origin, output_path)
+    return _tracer
+
+def get_tracer() -> StartupTracer:
+    """
+    Get the process-wide startup tracer (disabled unless configured)
+    """
+    return _tracer
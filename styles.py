@@ -175,19 +175,19 @@ class StyleSheet:
         }
         
         /* Table styles */
-        QTableWidget {
+        QTableView {
             border: none;
             background-color: white;
             gridline-color: #f0f0f0;
             border-radius: 8px;
         }
         
-        QTableWidget::item {
+        QTableView::item {
             padding: 8px;
             border-bottom: 1px solid #f0f0f0;
         }
         
-        QTableWidget::item:selected {
+        QTableView::item:selected {
             background-color: #e3f2fd;
             color: #2c3e50;
         }
@@ -270,6 +270,13 @@ class StyleSheet:
             background-color: #fadbd8;
             border-radius: 4px;
         }
+        
+        /* Shown while a page's data loads in the background */
+        #loadingLabel {
+            color: #7f8c8d;
+            font-style: italic;
+            padding: 0 10px;
+        }
     """
     
     # Dialog styles
@@ -288,4 +295,11 @@ class StyleSheet:
             padding: 20px;
             margin: 10px;
         }
-    """
\ No newline at end of file
+    """
+    
+    # Colours of the table action buttons painted by ActionButtonsDelegate,
+    # matching #editButton and #deleteButton above: (normal, hover)
+    ACTION_BUTTON_COLORS = {
+        "editButton": ("#3498db", "#2980b9"),
+        "deleteButton": ("#e74c3c", "#c0392b"),
+    }
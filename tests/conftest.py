@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import tempfile
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Before anything creates the Database singleton, which reads the path once
+os.environ['PHARMACY_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='pharmacy-tests-'), 'pharmacy.db')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from database import Database, init_database
+
+
+@pytest.fixture(scope='session')
+def database():
+    """
+    The Database singleton on a fresh, fully migrated test database
+    """
+    init_database()
+    db = Database()
+    yield db
+    db.close_all()
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """
+    Application object, so queued signals from worker threads are delivered
+    """
+    return QCoreApplication.instance() or QCoreApplication([])
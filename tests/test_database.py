@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import sqlite3
+import threading
+
+import pytest
+
+from database import (HOT_QUERIES, LOW_STOCK_THRESHOLD, SCHEMA_VERSION, MedicationCatalog, add_medication,
+                      check_query_plans, delete_medication, dispense_stock, get_inventory_counters,
+                      get_medication_by_id, get_medications_page, get_schema_version,
+                      get_stock_movement_report, import_medications,
+                      iter_medications, migrate, refresh_inventory_counters, rollup_stock_history,
+                      search_medications,
+                      update_medication_stock, update_medication_stock_batch, validate_medication_row)
+
+
+@pytest.mark.parametrize('entry', range(len(HOT_QUERIES)))
+def test_hot_query_uses_its_index(database, entry):
+    report = check_query_plans()[entry]
+    assert report['uses_index'], f"{report['query']} does not use {report['index']}: {report['plan']}"
+
+
+def test_stock_batch_keeps_a_concurrent_dispense(database):
+    before = get_medication_by_id(2)['stock']
+    dispensed = []
+    worker = threading.Thread(target=lambda: dispensed.append(dispense_stock(2, 5, "Concurrent dispense")))
+    
+    class RacingDelta:
+        # Converted between the batch's stock read and its write
+        def __int__(self):
+            worker.start()
+            worker.join(0.5)
+            return 10
+    
+    results = update_medication_stock_batch([{'medication_id': 2, 'delta': RacingDelta(), 'reason': "Restock"}])
+    worker.join()
+    
+    assert results[0]['success']
+    assert dispensed[0]['success']
+    assert get_medication_by_id(2)['stock'] == before + 10 - 5
+
+
+def set_stock_elsewhere(database, medication_id, stock):
+    conn = sqlite3.connect(database.db_path)
+    with conn:
+        conn.execute('UPDATE medications SET stock = ? WHERE id = ?', (stock, medication_id))
+    conn.close()
+
+
+def test_catalog_serves_repeat_reads_from_memory(database):
+    first = get_medication_by_id(3)
+    assert MedicationCatalog()._medications[3] is MedicationCatalog().get(3)
+    assert get_medication_by_id(3) == first
+
+
+def test_catalog_sees_a_write_from_another_connection(database):
+    stock = get_medication_by_id(3)['stock']
+    set_stock_elsewhere(database, 3, stock + 7)
+    assert get_medication_by_id(3)['stock'] == stock + 7
+
+
+def test_catalog_sees_a_write_made_while_the_thread_reconnected(database):
+    get_medication_by_id(4)
+    database.close()
+    set_stock_elsewhere(database, 4, 1)
+    assert get_medication_by_id(4)['stock'] == 1
+
+
+def test_catalog_keeps_a_written_through_medication_current(database):
+    medication_id = add_medication("Catalog test", "", "Test", 5, 2.5)
+    assert get_medication_by_id(medication_id)['stock'] == 5
+    assert dispense_stock(medication_id, 2, "Dispensed")['success']
+    assert get_medication_by_id(medication_id)['stock'] == 3
+    set_stock_elsewhere(database, medication_id, 9)
+    assert get_medication_by_id(medication_id)['stock'] == 9
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_medication_pages_need_a_positive_size(database, limit):
+    with pytest.raises(ValueError):
+        get_medications_page(limit=limit)
+    with pytest.raises(ValueError):
+        next(iter_medications(page_size=limit))
+
+
+@pytest.mark.parametrize('stock', [12.7, True, '12.7', 'many'])
+def test_imported_stock_must_be_a_whole_number(stock):
+    with pytest.raises(ValueError):
+        validate_medication_row({'name': "Aspirin", 'stock': stock})
+
+
+@pytest.mark.parametrize('stock, expected', [(12, 12), (12.0, 12), ('12', 12), (None, 0)])
+def test_imported_stock_accepts_whole_numbers(stock, expected):
+    assert validate_medication_row({'name': "Aspirin", 'stock': stock})[3] == expected
+
+
+def stock_history_count(database, medication_id):
+    with database.get_cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM stock_history WHERE medication_id = ?', (medication_id,))
+        return cursor.fetchone()[0]
+
+
+def test_dispense_takes_stock_and_records_it(database):
+    medication_id = add_medication("Dispense test", "", "Test", 10, 1.0)
+    result = dispense_stock(medication_id, 4, "Dispensed")
+    
+    assert result['success']
+    assert (result['previous_stock'], result['new_stock']) == (10, 6)
+    assert get_medication_by_id(medication_id)['stock'] == 6
+    assert stock_history_count(database, medication_id) == 1
+
+
+def test_dispense_reports_a_shortfall_without_changing_stock(database):
+    medication_id = add_medication("Shortfall test", "", "Test", 3, 1.0)
+    result = dispense_stock(medication_id, 5, "Dispensed")
+    
+    assert not result['success']
+    assert result['available'] == 3
+    assert result['name'] == "Shortfall test"
+    assert get_medication_by_id(medication_id)['stock'] == 3
+    assert stock_history_count(database, medication_id) == 0
+
+
+def test_dispense_reports_a_missing_medication(database):
+    result = dispense_stock(999999, 1, "Dispensed")
+    assert not result['success']
+    assert result['available'] is None
+    assert result['error'] == "Medication not found."
+
+
+def test_concurrent_dispenses_never_oversell(database):
+    medication_id = add_medication("Oversell test", "", "Test", 10, 1.0)
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(dispense_stock(medication_id, 3, "Dispensed")))
+               for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    assert sum(result['success'] for result in results) == 3
+    assert get_medication_by_id(medication_id)['stock'] == 1
+
+
+BASELINE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pharmacy.db')
+
+
+def table_counts(path, tables):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in tables}
+    finally:
+        conn.close()
+
+
+def test_migrate_brings_the_baseline_database_up_to_date(database, tmp_path, monkeypatch):
+    path = str(tmp_path / 'pharmacy.db')
+    shutil.copyfile(BASELINE_DB, path)
+    tables = ('users', 'medications', 'stock_history')
+    before = table_counts(path, tables)
+    
+    database.close_all()
+    monkeypatch.setattr(database, 'db_path', path)
+    try:
+        assert migrate() == list(range(1, SCHEMA_VERSION + 1))
+        assert get_schema_version() == SCHEMA_VERSION
+        assert migrate() == []
+        
+        with database.get_cursor() as cursor:
+            cursor.execute('SELECT name FROM medications ORDER BY id LIMIT 1')
+            name = cursor.fetchone()['name']
+        assert any(row['name'] == name for row in search_medications(name))
+    finally:
+        database.close_all()
+        MedicationCatalog().invalidate()
+    
+    assert table_counts(path, tables) == before
+
+
+def assert_counters_match_a_recount():
+    counters = get_inventory_counters()
+    refresh_inventory_counters()
+    recount = get_inventory_counters()
+    
+    assert counters['total_stock_value'] == pytest.approx(recount.pop('total_stock_value'))
+    del counters['total_stock_value']
+    assert counters == recount
+
+
+def test_inventory_counter_triggers_match_a_recount(database):
+    refresh_inventory_counters()
+    
+    ids = [add_medication(f"Counter test {stock}", "", "Test", stock, 1.25)
+           for stock in (0, LOW_STOCK_THRESHOLD, LOW_STOCK_THRESHOLD + 1)]
+    import_medications([{'name': "Counter import", 'stock': 2, 'price': 3.5}])
+    assert_counters_match_a_recount()
+    
+    # Across the out-of-stock, low and in-stock boundaries, and a price change
+    assert update_medication_stock(ids[0], LOW_STOCK_THRESHOLD + 5, "Restock")
+    assert update_medication_stock(ids[2], 0, "Written off")
+    assert dispense_stock(ids[1], 1, "Dispensed")['success']
+    with database.transaction() as cursor:
+        cursor.execute('UPDATE medications SET price = 9.99 WHERE id = ?', (ids[1],))
+    assert_counters_match_a_recount()
+    
+    for medication_id in ids:
+        assert delete_medication(medication_id)
+    assert_counters_match_a_recount()
+
+
+def raw_movement(database, medication_id=None):
+    with database.get_cursor() as cursor:
+        cursor.execute('''SELECT date(timestamp) AS day, medication_id, previous_stock, new_stock
+                          FROM stock_history WHERE medication_id IS NOT NULL''')
+        history = cursor.fetchall()
+    
+    movement = {}
+    for row in history:
+        if medication_id is not None and row['medication_id'] != medication_id:
+            continue
+        change = (row['new_stock'] or 0) - (row['previous_stock'] or 0)
+        day = movement.setdefault(row['day'], {'qty_in': 0, 'qty_out': 0, 'net': 0, 'events': 0})
+        day['qty_in'] += max(change, 0)
+        day['qty_out'] += max(-change, 0)
+        day['net'] += change
+        day['events'] += 1
+    return movement
+
+
+def reported_movement(**filters):
+    return {row['day']: {key: row[key] for key in ('qty_in', 'qty_out', 'net', 'events')}
+            for row in get_stock_movement_report(**filters)}
+
+
+def add_history(database, medication_id, previous_stock, new_stock, timestamp):
+    with database.transaction() as cursor:
+        cursor.execute('''INSERT INTO stock_history (medication_id, previous_stock, new_stock, reason, timestamp)
+                          VALUES (?, ?, ?, 'Backdated', ?)''',
+                       (medication_id, previous_stock, new_stock, timestamp))
+
+
+def test_stock_movement_report_matches_the_raw_history(database):
+    medication_id = add_medication("Movement test", "", "Test", 20, 1.0)
+    add_history(database, medication_id, 20, 50, '2024-03-01 09:00:00')
+    add_history(database, medication_id, 50, 45, '2024-03-01 17:30:00')
+    add_history(database, medication_id, 45, 30, '2024-03-02 12:00:00')
+    assert update_medication_stock(medication_id, 40, "Restock")
+    
+    assert rollup_stock_history() > 0
+    
+    # Rows after the rollup, one for a day already rolled up
+    add_history(database, medication_id, 30, 28, '2024-03-02 18:00:00')
+    assert dispense_stock(medication_id, 7, "Dispensed")['success']
+    
+    assert reported_movement(medication_id=medication_id) == raw_movement(database, medication_id)
+    assert reported_movement(per_medication=False) == raw_movement(database)
+    
+    day = reported_movement(medication_id=medication_id, start_day='2024-03-02', end_day='2024-03-02')
+    assert day == {'2024-03-02': {'qty_in': 0, 'qty_out': 17, 'net': -17, 'events': 2}}
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+from PyQt5.QtCore import QThreadPool
+
+from database import get_all_users
+from db_tasks import TaskRunner
+
+
+def run_tasks(app, runner, count, fn, timeout=30):
+    """
+    Submit fn count times under separate keys and wait for every callback
+    """
+    results, errors = [], []
+    for i in range(count):
+        runner.submit(f'task_{i}', fn, on_result=results.append, on_error=errors.append)
+    
+    deadline = time.monotonic() + timeout
+    while len(results) + len(errors) < count and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    return results, errors
+
+
+def test_overlapping_tasks_check_out_pooled_connections(qapp, database, monkeypatch):
+    database.close_all()
+    monkeypatch.setattr(database, 'pool_size', 2)
+    pool = QThreadPool()
+    pool.setMaxThreadCount(4)
+    runner = TaskRunner(pool=pool)
+    
+    def query():
+        conn = database.conn
+        get_all_users()
+        # Hold the connection while the other workers run their tasks
+        time.sleep(0.01)
+        assert database.conn is conn
+        conn.execute('SELECT 1')
+        return id(conn)
+    
+    results, errors = run_tasks(qapp, runner, 40, query)
+    pool.waitForDone()
+    
+    assert errors == []
+    assert len(results) == 40
+    # Every task reused one of the pool's connections
+    assert len(set(results)) <= 2
+    assert len(database._pooled) <= 2
+    assert len(database._idle) == len(database._pooled)
+
+
+def test_task_connection_is_returned_after_an_error(qapp, database):
+    pool = QThreadPool()
+    pool.setMaxThreadCount(2)
+    runner = TaskRunner(pool=pool)
+    
+    def fail():
+        database.connect().execute('BEGIN')
+        raise RuntimeError("boom")
+    
+    results, errors = run_tasks(qapp, runner, 5, fail)
+    pool.waitForDone()
+    
+    assert errors == ["boom"] * 5
+    assert len(database._idle) == len(database._pooled)
+    assert not any(conn.in_transaction for conn in database._idle)